@@ -0,0 +1,15 @@
+"""
+Scripts do pipeline de listas de exercícios
+
+Cada módulo também é executado direto (python3 scripts/run_tests.py) e
+importa os vizinhos pelo nome (from compile_cache import ...). Para que o
+mesmo funcione com ``import scripts.run_tests``, este diretório entra no
+sys.path. Nenhum módulo executa trabalho ao ser importado.
+"""
+
+import os
+import sys
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, _SCRIPTS_DIR)
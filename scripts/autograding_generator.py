@@ -5,10 +5,23 @@ Autograding Generator - Gera configuração do GitHub Classroom
 
 import os
 import json
+import shlex
 from pathlib import Path
 
+from instrumentation import span, count
+from payloads import payload_path
+from run_tests import exercise_timeout
+
 TEMP_DIR = Path("temp")
 GITHUB_DIR = Path(".github/classroom")
+# Testes funcionais usam o build rápido; testes com "profile": "optimized"
+# formam um grupo à parte, compilado com -O2 só quando o primeiro deles roda
+COMPILE_CMDS = {
+    'fast': "g++ -std=c++17 -Wall -O0 main.cpp -o exercise",
+    'optimized': "g++ -std=c++17 -Wall -O2 main.cpp -o exercise-O2",
+}
+BINARIES = {'fast': "exercise", 'optimized': "exercise-O2"}
+DEFAULT_PROFILE = 'fast'
 
 def generate_autograding_config():
     """Gera configuração do autograding.json"""
@@ -23,37 +36,74 @@ def generate_autograding_config():
     autograding_tests = []
     
     for test_file in test_files:
-        with open(test_file, 'r', encoding='utf-8') as f:
-            lista_data = json.load(f)
+        with span('load_json', cat='io', file=str(test_file)):
+            with open(test_file, 'r', encoding='utf-8') as f:
+                lista_data = json.load(f)
         
         lista_name = lista_data['lista_name']
         
         for exercise in lista_data['exercises']:
-            ex_num = exercise['number']
-            ex_dir = f"src/{lista_name}/ex{ex_num:02d}"
-            
-            for test in exercise.get('tests', []):
-                test_config = {
-                    'name': f"{lista_name} - Ex{ex_num:02d} - {test['name']}",
-                    'setup': f"cd {ex_dir} && g++ -std=c++17 -Wall -O2 main.cpp -o exercise",
-                    'run': f"cd {ex_dir} && echo '{test['input']}' | ./exercise",
-                    'input': test['input'],
-                    'output': test['expected'],
-                    'comparison': 'exact',
-                    'timeout': 1
-                }
-                
-                autograding_tests.append(test_config)
+            autograding_tests.extend(exercise_autograding_tests(lista_name, exercise))
+    
+    return build_autograding_config(autograding_tests)
+
+def exercise_autograding_tests(lista_name, exercise):
+    """Entradas do autograding.json para os testes de um exercício"""
+    ex_num = exercise['number']
+    ex_dir = f"src/{lista_name}/ex{ex_num:02d}"
+    autograding_tests = []
+    # Segundos, do @timeout do main.cpp ou do timeout_ms do exercício
+    timeout = exercise_timeout(exercise, Path(ex_dir) / "main.cpp")
     
-    autograding_config = {
+    # Apenas o primeiro teste do grupo compila; os demais reutilizam o binário
+    groups = set()
+    for test in exercise.get('tests', []):
+        profile = test.get('profile', exercise.get('profile', DEFAULT_PROFILE))
+        group = ex_dir if profile == DEFAULT_PROFILE else f"{ex_dir}:{profile}"
+        test_config = {
+            'name': f"{lista_name} - Ex{ex_num:02d} - {test['name']}",
+            'group': group,
+            'setup': f"cd {ex_dir} && {COMPILE_CMDS[profile]}" if group not in groups else "",
+            'run': f"cd {ex_dir} && ./{BINARIES[profile]}",
+            'input': test.get('input', ''),
+            'output': test.get('expected', ''),
+            'comparison': test.get('comparison', 'exact'),
+            'timeout': test.get('timeout', timeout)
+        }
+        # Entrada grande: o runner redireciona o arquivo em vez de receber o texto
+        input_file = payload_path(test, 'input')
+        if input_file is not None:
+            test_config['run'] += f" < {shlex.quote(os.path.relpath(input_file, ex_dir))}"
+            test_config['input_sha256'] = test['input_sha256']
+        if payload_path(test, 'expected') is not None:
+            test_config['output_file'] = test['expected_file']
+            test_config['output_sha256'] = test['expected_sha256']
+        if 'tolerance' in test:
+            test_config['tolerance'] = test['tolerance']
+        
+        groups.add(group)
+        autograding_tests.append(test_config)
+    
+    return autograding_tests
+
+def build_autograding_config(autograding_tests):
+    """Monta o autograding.json a partir da lista de testes"""
+    return {
         'tests': autograding_tests,
         'metadata': {
             'generated_by': 'template-cpp-autograding-generator',
             'total_tests': len(autograding_tests)
         }
     }
-    
-    return autograding_config
+
+def save_autograding_config(config):
+    """Grava o autograding.json em .github/classroom"""
+    GITHUB_DIR.mkdir(parents=True, exist_ok=True)
+    output_file = GITHUB_DIR / "autograding.json"
+    with span('write_json', cat='io', file=str(output_file)):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+    return output_file
 
 def main():
     """Função principal"""
@@ -62,12 +112,12 @@ def main():
     
     print("Gerando configuração do GitHub Classroom...")
     
-    config = generate_autograding_config()
+    with span('generate_config'):
+        config = generate_autograding_config()
     
     if config:
-        output_file = GITHUB_DIR / "autograding.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        count('tests', config['metadata']['total_tests'])
+        output_file = save_autograding_config(config)
         
         print(f"\n{'='*50}")
         print(f"Configuração gerada com sucesso!")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Batch Harness - Executa vários casos de teste em um único processo
+
+Exercícios que optam por isso (``"harness": "batch"`` no JSON) têm o ``main``
+do aluno renomeado para ``student_main`` e ligado a um driver que troca os
+buffers de ``cin``/``cout`` por buffers em memória a cada caso. Qualquer
+sinal de problema (falha de compilação, crash, estado global, E/S em C)
+faz o chamador voltar para um processo por teste.
+"""
+
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Dict, Tuple, Optional
+
+from compile_cache import CompileCache, cache_key
+from comparator import compare_output
+from payloads import load_payload
+from pch import pch_flags
+
+HARNESS_BIN = "harness"
+
+# E/S fora de cin/cout não é capturada pelo driver
+C_STDIO_PATTERN = re.compile(r'\b(?:printf|scanf|puts|gets|getchar|putchar|fgets|fputs|exit|abort)\s*\(')
+
+DRIVER_SOURCE = r"""
+#include <chrono>
+#include <fstream>
+#include <iostream>
+#include <sstream>
+#include <string>
+
+int student_main();
+
+static bool read_frame(std::istream& in, std::string& data) {
+    size_t len;
+    if (!(in >> len)) return false;
+    in.get();
+    data.resize(len);
+    in.read(&data[0], len);
+    return static_cast<size_t>(in.gcount()) == len;
+}
+
+int main(int argc, char** argv) {
+    if (argc < 3) return 2;
+    // Desligado aqui, o sync_with_stdio(false) do aluno não faz nada; ligado,
+    // ele trocaria o rdbuf de cin/cout pelo stdin/stdout reais do processo
+    std::ios::sync_with_stdio(false);
+    std::ifstream cases(argv[1], std::ios::binary);
+    std::ofstream results(argv[2], std::ios::binary);
+    std::streambuf* orig_in = std::cin.rdbuf();
+    std::streambuf* orig_out = std::cout.rdbuf();
+    std::string input;
+
+    while (read_frame(cases, input)) {
+        std::istringstream in(input);
+        std::ostringstream out;
+        std::cin.clear();
+        std::cin.rdbuf(in.rdbuf());
+        std::cout.clear();
+        std::cout.rdbuf(out.rdbuf());
+
+        auto start = std::chrono::steady_clock::now();
+        int code = student_main();
+        std::cout.flush();
+        auto elapsed = std::chrono::duration_cast<std::chrono::microseconds>(
+            std::chrono::steady_clock::now() - start).count();
+
+        std::cin.rdbuf(orig_in);
+        std::cout.rdbuf(orig_out);
+        const std::string data = out.str();
+        results << data.size() << ' ' << code << ' ' << elapsed << '\n' << data;
+        results.flush();
+    }
+    return 0;
+}
+"""
+
+def supports_batch(ex_dir: Path) -> bool:
+    """Verifica se o fonte pode rodar no driver (sem E/S de C nem exit())"""
+    main_cpp = ex_dir / "main.cpp"
+    if not main_cpp.exists():
+        return False
+    return not C_STDIO_PATTERN.search(main_cpp.read_text(encoding='utf-8', errors='replace'))
+
+def compile_harness(ex_dir: Path, cxx: str, flags: List[str],
+                    cache: Optional[CompileCache] = None, pch: bool = False) -> Optional[Path]:
+    """Compila main.cpp + driver; retorna o binário ou None se não for possível"""
+    bin_dir = ex_dir / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    main_cpp = ex_dir / "main.cpp"
+    harness_bin = bin_dir / HARNESS_BIN
+    # Renomeado, o main perde o "return 0" implícito: sem return o comportamento
+    # é indefinido (com -O2 o g++ chega a travar), então o lote é recusado
+    harness_flags = [*flags, "-Dmain=student_main", "-Werror=return-type"]
+
+    key = None
+    if cache is not None:
+        key = cache_key(main_cpp.read_bytes() + DRIVER_SOURCE.encode('utf-8'), cxx, harness_flags)
+        if cache.fetch(key, harness_bin):
+            return harness_bin
+
+    driver_cpp = bin_dir / "harness_driver.cpp"
+    driver_cpp.write_text(DRIVER_SOURCE, encoding='utf-8')
+
+    # O driver é compilado à parte para manter o próprio main
+    student_obj = bin_dir / "student.o"
+    extra = pch_flags(main_cpp.read_bytes(), cxx, harness_flags) if pch else []
+    cmd = [cxx, *harness_flags, *extra, "-c", str(main_cpp), "-o", str(student_obj)]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            return None
+        result = subprocess.run(
+            [cxx, *flags, str(driver_cpp), str(student_obj), "-o", str(harness_bin)],
+            capture_output=True, text=True, timeout=30
+        )
+        if result.returncode != 0:
+            return None
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+
+    if cache is not None:
+        cache.store(key, harness_bin)
+    return harness_bin
+
+def _parse_results(data: bytes, count: int) -> Optional[List[Tuple[str, int, float]]]:
+    """Lê os quadros '<tamanho> <código> <µs>\\n<saída>' escritos pelo driver"""
+    frames = []
+    pos = 0
+    while pos < len(data):
+        newline = data.find(b'\n', pos)
+        if newline < 0:
+            return None
+        try:
+            length, code, micros = (int(x) for x in data[pos:newline].split())
+        except ValueError:
+            return None
+        start = newline + 1
+        output = data[start:start + length]
+        if len(output) != length:
+            return None
+        frames.append((output.decode('utf-8', errors='replace'), code, micros / 1e6))
+        pos = start + length
+    return frames if len(frames) == count else None
+
+def run_batch(harness_bin: Path, tests: List[Dict],
+              preexec_fn: Optional[Callable[[], None]] = None) -> Optional[List[Tuple[bool, str, float]]]:
+    """Roda todos os testes em um processo; None indica que é preciso voltar ao modo normal"""
+    if not tests:
+        return []
+
+    timeout = sum(test.get('timeout', 1) for test in tests) + tests[0].get('timeout', 1)
+    frames = run_batch_outputs(harness_bin, [load_payload(test, 'input') for test in tests], timeout, preexec_fn)
+    if frames is None:
+        return None
+
+    outcomes = []
+    for test, (output, _, elapsed) in zip(tests, frames):
+        actual_output = output.strip()
+        success = compare_output(load_payload(test, 'expected'), output,
+                                 test.get('comparison', 'exact'), test.get('tolerance'))
+        outcomes.append((success, actual_output, elapsed))
+    return outcomes
+
+def run_batch_outputs(harness_bin: Path, inputs: List[str], timeout: float,
+                      preexec_fn: Optional[Callable[[], None]] = None) -> Optional[List[Tuple[str, int, float]]]:
+    """Roda as entradas em um processo e devolve (saída, código, tempo) de cada uma"""
+    if not inputs:
+        return []
+
+    # O primeiro caso é repetido no final: saída diferente denuncia estado global
+    cases = [*inputs, inputs[0]]
+
+    with tempfile.TemporaryDirectory(prefix="harness-") as tmp:
+        cases_file = Path(tmp) / "cases"
+        results_file = Path(tmp) / "results"
+        with open(cases_file, 'wb') as f:
+            for case in cases:
+                data = case.encode('utf-8')
+                f.write(f"{len(data)}\n".encode('ascii'))
+                f.write(data)
+
+        try:
+            result = subprocess.run(
+                [str(harness_bin), str(cases_file), str(results_file)],
+                stdin=subprocess.DEVNULL, capture_output=True, timeout=timeout, preexec_fn=preexec_fn
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+
+        if result.returncode != 0 or not results_file.exists():
+            return None
+        frames = _parse_results(results_file.read_bytes(), len(cases))
+
+    if frames is None or frames[0][0] != frames[-1][0]:
+        return None
+    return frames[:-1]
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Benchmark - Mede o tempo e a memória de cada etapa do pipeline
+
+Gera corpora sintéticos (N listas x M exercícios x K testes, em PDF com
+camada de texto e em Markdown) e grava wall time, CPU e pico de RSS em JSON.
+Cada corpus é processado de duas formas: uma etapa por processo, passando
+pelos arquivos de temp/ (pdf_processor, exercise_parser, test_generator,
+autograding_generator, como o make process-pdfs-stages), e com o
+pipeline.py em um só processo, em memória, como o make process-pdfs. Um
+resultado salvo pode ser usado como linha de base.
+
+Com --startup mede só a partida de cada script em um diretório vazio (sem
+PDFs nem JSON), o custo fixo pago em toda execução e em todo job de CI.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = Path("temp") / "benchmark.json"
+
+# Tamanhos: (listas, exercícios por lista, testes por exercício)
+SIZES = {
+    'small': (1, 5, 3),
+    'medium': (5, 20, 5),
+    'large': (20, 40, 10),
+}
+FORMATS = ['pdf', 'md']
+STARTUP_BUDGET_MS = 100
+
+STAGES = [
+    ('pdf_processor', 'pdf_processor.py'),
+    ('exercise_parser', 'exercise_parser.py'),
+    ('test_generator', 'test_generator.py'),
+    ('autograding_generator', 'autograding_generator.py'),
+    ('run_tests', 'run_tests.py'),
+]
+# Etapas que o pipeline.py faz sozinho, comparadas com ele no relatório
+PIPELINE_STAGES = ['pdf_processor', 'exercise_parser', 'test_generator', 'autograding_generator']
+
+EXERCISE_TEXT = (
+    "Escreva um programa que leia dois números inteiros e imprima a soma deles. "
+    "Use variáveis do tipo int e mostre o resultado na saída padrão."
+)
+
+SOLUTION_CPP = """#include <iostream>
+using namespace std;
+
+int main() {
+    long long a, b;
+    cin >> a >> b;
+    cout << a + b << endl;
+    return 0;
+}
+"""
+
+def pymupdf_available() -> bool:
+    """Verifica se é possível gerar PDFs com camada de texto"""
+    return importlib.util.find_spec("fitz") is not None
+
+def write_markdown_list(path: Path, lista: int, exercises: int):
+    """Gera um deck de slides no formato de pdfs/lista-basico-cpp.md"""
+    slides = [f"---\ntitle: 'Lista {lista}'\n---\n"]
+    for ex in range(1, exercises + 1):
+        slides.append(f"Lista {lista}\n---\n\n# Exercício {ex}\n<!-- new_lines: 1 -->\n\n{EXERCISE_TEXT}\n")
+    path.write_text("\n<!-- end_slide -->\n\n".join(slides), encoding='utf-8')
+
+def write_pdf_list(path: Path, lista: int, exercises: int):
+    """Gera um PDF com camada de texto, um exercício por página"""
+    import fitz
+    doc = fitz.open()
+    for ex in range(1, exercises + 1):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 520, 760),
+                            f"Lista {lista}\n\n{ex}. {EXERCISE_TEXT}", fontsize=11)
+    doc.save(str(path))
+    doc.close()
+
+def build_corpus(root: Path, size: str, fmt: str):
+    """Cria pdfs/ com as listas sintéticas de um tamanho e formato"""
+    listas, exercises, _ = SIZES[size]
+    pdfs_dir = root / "pdfs"
+    pdfs_dir.mkdir(parents=True, exist_ok=True)
+    for lista in range(1, listas + 1):
+        if fmt == 'md':
+            write_markdown_list(pdfs_dir / f"lista{lista:02d}.md", lista, exercises)
+        else:
+            write_pdf_list(pdfs_dir / f"lista{lista:02d}.pdf", lista, exercises)
+
+def prepare_run_tests(root: Path, size: str):
+    """Põe uma solução e K testes de soma em cada exercício (fora da medição)"""
+    tests_per_exercise = SIZES[size][2]
+    for test_file in sorted((root / "temp").glob("*_with_tests.json")):
+        with open(test_file, 'r', encoding='utf-8') as f:
+            lista_data = json.load(f)
+        for exercise in lista_data['exercises']:
+            exercise['tests'] = [
+                {'name': f'Caso {k}', 'input': f'{k} {k * 7}', 'expected': str(k * 8)}
+                for k in range(1, tests_per_exercise + 1)
+            ]
+            ex_dir = root / "listas" / lista_data['lista_name'] / f"ex{exercise['number']:02d}"
+            ex_dir.mkdir(parents=True, exist_ok=True)
+            (ex_dir / "main.cpp").write_text(SOLUTION_CPP, encoding='utf-8')
+        with open(test_file, 'w', encoding='utf-8') as f:
+            json.dump(lista_data, f, ensure_ascii=False, indent=2)
+
+def run_stage(root: Path, script: str) -> Dict:
+    """Roda um script do pipeline e mede wall time, CPU e pico de RSS do processo"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(SCRIPTS_DIR / script)],
+        cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # wait4 devolve o rusage só deste filho (e dos netos que ele esperou)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'wall': elapsed,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'max_rss_kb': usage.ru_maxrss,
+        'returncode': proc.returncode,
+    }
+
+def run_case(size: str, fmt: str) -> Dict:
+    """Executa o pipeline completo sobre um corpus novo"""
+    with tempfile.TemporaryDirectory(prefix=f"bench-{size}-{fmt}-") as tmp:
+        root = Path(tmp) / "stages"
+        pipeline_root = Path(tmp) / "pipeline"
+        # O corpus é gerado em outro processo: o ru_maxrss de um filho parte do
+        # RSS do pai no fork, e importar o PyMuPDF aqui inflaria todas as medidas
+        subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), '--build-corpus', str(root), size, fmt],
+            check=True
+        )
+        shutil.copytree(root, pipeline_root)
+        
+        stages = {}
+        for name, script in STAGES:
+            if name == 'run_tests':
+                prepare_run_tests(root, size)
+            stages[name] = run_stage(root, script)
+        
+        # Mesmo corpus, as quatro primeiras etapas em um processo e sem temp/
+        pipeline = run_stage(pipeline_root, 'pipeline.py')
+    
+    return {
+        'size': size,
+        'format': fmt,
+        'shape': dict(zip(('listas', 'exercises', 'tests'), SIZES[size])),
+        'stages': stages,
+        'pipeline': pipeline,
+        'total': {
+            'wall': sum(s['wall'] for s in stages.values()),
+            'cpu': sum(s['cpu'] for s in stages.values()),
+            'max_rss_kb': max(s['max_rss_kb'] for s in stages.values()),
+        },
+    }
+
+def measure_startup(repeat: int = 5) -> Dict:
+    """Menor tempo (ms) de uma execução sem trabalho de cada script e do interpretador puro"""
+    commands = [('python', [sys.executable, '-c', 'pass'])]
+    commands += [(name, [sys.executable, str(SCRIPTS_DIR / script)]) for name, script in STAGES]
+    commands.append(('pipeline', [sys.executable, str(SCRIPTS_DIR / 'pipeline.py')]))
+    
+    startup = {}
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        for name, cmd in commands:
+            times = []
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                subprocess.run(cmd, cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                times.append((time.perf_counter() - start) * 1000)
+            startup[name] = min(times)
+    return startup
+
+def best_of(runs: List[Dict]) -> Dict:
+    """Combina repetições: menor tempo e menor pico de RSS de cada etapa"""
+    best = runs[0]
+    for run in runs[1:]:
+        for name, stage in run['stages'].items():
+            for metric in ('wall', 'cpu', 'max_rss_kb'):
+                best['stages'][name][metric] = min(best['stages'][name][metric], stage[metric])
+        for metric in ('wall', 'cpu', 'max_rss_kb'):
+            best['total'][metric] = min(best['total'][metric], run['total'][metric])
+            best['pipeline'][metric] = min(best['pipeline'][metric], run['pipeline'][metric])
+    return best
+
+def staged_total(case: Dict) -> Dict:
+    """Soma das etapas separadas que o pipeline.py substitui"""
+    stages = [case['stages'][name] for name in PIPELINE_STAGES if name in case['stages']]
+    return {
+        'wall': sum(s['wall'] for s in stages),
+        'cpu': sum(s['cpu'] for s in stages),
+        'max_rss_kb': max((s['max_rss_kb'] for s in stages), default=0),
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Lista as etapas que ficaram mais lentas que a linha de base além do limite"""
+    regressions = []
+    for case_name, case in current['cases'].items():
+        base_case = baseline.get('cases', {}).get(case_name)
+        if not base_case:
+            continue
+        entries = list(case['stages'].items()) + [('total', case['total']), ('pipeline', case.get('pipeline'))]
+        for name, stage in entries:
+            base = base_case.get(name) if name in ('total', 'pipeline') else base_case['stages'].get(name)
+            if not stage:
+                continue
+            if not base or base['wall'] <= 0:
+                continue
+            ratio = stage['wall'] / base['wall']
+            if ratio > 1 + threshold:
+                regressions.append(f"{case_name}/{name}: {base['wall']:.3f}s -> {stage['wall']:.3f}s ({ratio:.2f}x)")
+    return regressions
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    """Imprime uma tabela por caso com o tempo de cada etapa"""
+    print("\n" + "="*70)
+    print("BENCHMARK DO PIPELINE")
+    print("="*70)
+    
+    for case_name, case in report['cases'].items():
+        shape = case['shape']
+        print(f"\n{case_name}: {shape['listas']} lista(s) x {shape['exercises']} exercício(s) x {shape['tests']} teste(s)")
+        base_case = (baseline or {}).get('cases', {}).get(case_name, {})
+        entries = list(case['stages'].items()) + [('total', case['total'])]
+        if case.get('pipeline'):
+            entries += [('etapas 1-4 separadas', staged_total(case)), ('pipeline', case['pipeline'])]
+        for name, stage in entries:
+            line = f"   {name:<22} {stage['wall']:8.3f}s  cpu {stage['cpu']:7.3f}s  rss {stage['max_rss_kb'] / 1024:7.1f} MB"
+            if name in ('total', 'pipeline'):
+                base = base_case.get(name)
+            else:
+                base = base_case.get('stages', {}).get(name)
+            if base and base['wall'] > 0:
+                line += f"  ({stage['wall'] / base['wall']:.2f}x da base)"
+            if name == 'pipeline' and staged_total(case)['wall'] > 0:
+                line += f"  ({staged_total(case)['wall'] / max(stage['wall'], 1e-9):.2f}x mais rápido que as etapas)"
+            print(line)
+    
+    print("\n" + "="*70)
+
+def main():
+    """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Mede o desempenho de cada etapa do pipeline')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'],
+                        help='Tamanhos de corpus a medir (padrão: small medium)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS,
+                        help='Formatos de entrada (pdf com camada de texto, md)')
+    parser.add_argument('--repeat', type=int, default=1, help='Repetições por caso (vale o melhor tempo)')
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, help='Arquivo JSON com os resultados')
+    parser.add_argument('--baseline', type=Path, help='Resultado anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Aumento relativo de tempo considerado regressão (padrão: 0.2)')
+    parser.add_argument('--startup', action='store_true',
+                        help=f'Mede só a partida dos scripts sem trabalho (meta: {STARTUP_BUDGET_MS} ms)')
+    parser.add_argument('--build-corpus', nargs=3, metavar=('DIR', 'SIZE', 'FORMAT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.build_corpus:
+        root, size, fmt = args.build_corpus
+        build_corpus(Path(root), size, fmt)
+        return
+    
+    if args.startup:
+        startup = measure_startup(max(5, args.repeat))
+        print(f"\n{'script':<24} {'partida':>10}")
+        for name, ms in startup.items():
+            mark = "  ⚠️" if name != 'python' and ms >= STARTUP_BUDGET_MS else ""
+            print(f"{name:<24} {ms:8.1f}ms{mark}")
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'startup': startup}, f, indent=2)
+        print(f"Resultados salvos em: {args.output}")
+        return
+    
+    formats = list(args.formats)
+    if 'pdf' in formats and not pymupdf_available():
+        print("Aviso: PyMuPDF não instalado; casos em PDF ignorados.")
+        formats.remove('pdf')
+    
+    if shutil.which("g++") is None:
+        print("Aviso: g++ não encontrado; a etapa run_tests vai falhar na compilação.")
+    
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'cases': {},
+    }
+    
+    for size in args.sizes:
+        for fmt in formats:
+            case_name = f"{size}-{fmt}"
+            print(f"Medindo {case_name}...")
+            runs = [run_case(size, fmt) for _ in range(max(1, args.repeat))]
+            report['cases'][case_name] = best_of(runs)
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    
+    print_report(report, baseline)
+    
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Resultados salvos em: {args.output}")
+    
+    if baseline:
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressão(ões) acima de {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print("✅ Nenhuma regressão em relação à linha de base")
+
+if __name__ == "__main__":
+    main()
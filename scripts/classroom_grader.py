@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Classroom Grader - Corrige muitos repositórios de alunos ao mesmo tempo
+
+Recebe um diretório com um checkout por aluno (cada um com sua própria árvore
+listas/*/ex*) e aplica os testes de temp/*_with_tests.json em todos eles,
+com as mesmas regras do run_tests.py. Compilações e execuções são
+subprocessos assíncronos limitados por semáforos (um global e um para cada
+tipo de trabalho), de modo que um repositório lento não segura os outros.
+Cada exercício corrigido é gravado no relatório assim que termina.
+
+Submissões com o mesmo fonte normalizado (sem comentários nem espaços) são
+compiladas e testadas uma única vez e o resultado vale para todas; ao final
+um relatório agrupa as submissões idênticas e aponta as muito parecidas.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+from compile_cache import CompileCache, cache_key, DEFAULT_MAX_BYTES
+from comparator import comparator_for
+from payloads import PayloadError, open_input, payload_label
+from source_dedup import source_fingerprint, file_fingerprint, cluster_report, DEFAULT_SIMILARITY
+from instrumentation import span, count
+from pch import pch_flags
+from results_store import ResultsWriter
+from run_tests import (TEMP_DIR, LISTAS_DIR, CXX, BUILD_PROFILES, PROFILE_BINARIES, DEFAULT_PROFILE,
+                       DEFAULT_TIMEOUT, VERDICT_AC, VERDICT_WA, VERDICT_RE,
+                       exercise_timeout, with_timeouts, test_profile)
+import sandbox
+
+DEFAULT_REPORT = TEMP_DIR / "classroom_report.jsonl"
+DEFAULT_CLUSTERS = TEMP_DIR / "classroom_clusters.json"
+DEFAULT_RESULTS = TEMP_DIR / "classroom_results.cols"
+DEFAULT_CONCURRENCY = (os.cpu_count() or 1) * 2
+COMPILE_TIMEOUT = 30
+
+class Limiter:
+    """Semáforo global mais um limite separado para compilações e execuções"""
+    
+    def __init__(self, total: int, compiles: int, executions: int):
+        self._total = asyncio.Semaphore(total)
+        self._compiles = asyncio.Semaphore(compiles)
+        self._executions = asyncio.Semaphore(executions)
+    
+    @asynccontextmanager
+    async def compile(self):
+        # O limite específico vem antes para que uma fila de compilações não
+        # ocupe as vagas globais das execuções
+        async with self._compiles, self._total:
+            yield
+    
+    @asynccontextmanager
+    async def execute(self):
+        async with self._executions, self._total:
+            yield
+
+class Deduplicator:
+    """Compartilha a correção entre submissões com o mesmo fonte normalizado"""
+    
+    def __init__(self):
+        self.hits = 0
+        # (lista, exercício) -> hash normalizado -> repositórios
+        self.groups = defaultdict(lambda: defaultdict(list))
+        # (lista, exercício) -> hash normalizado -> fonte do representante
+        self.sources = defaultdict(dict)
+        self._graded = {}
+    
+    async def grade(self, ex_dir: Path, lista_name: str, ex_num: int, grade) -> Dict:
+        """Corrige via grade() só a primeira submissão de cada fonte; as demais esperam por ela"""
+        try:
+            source = (ex_dir / "main.cpp").read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            return await grade()
+        
+        fingerprint = source_fingerprint(source)
+        exercise_key = (lista_name, ex_num)
+        self.groups[exercise_key][fingerprint].append(ex_dir)
+        
+        # Sem await entre a consulta e o registro: o loop não troca de tarefa aqui
+        key = (lista_name, ex_num, fingerprint)
+        shared = self._graded.get(key)
+        if shared is None:
+            self.sources[exercise_key][fingerprint] = source
+            shared = self._graded[key] = asyncio.ensure_future(grade())
+        else:
+            self.hits += 1
+            count('dedup_hits')
+        
+        result = await shared
+        representative = self.groups[exercise_key][fingerprint][0]
+        compilation = dict(result['compilation'])
+        compilation['message'] = compilation['message'].replace(str(representative), str(ex_dir))
+        return {**result, 'repo': ex_dir.parents[2].name, 'compilation': compilation,
+                'fingerprint': fingerprint, 'graded_as': representative.parents[2].name}
+    
+    def report(self, threshold: float = DEFAULT_SIMILARITY) -> Dict:
+        """Relatório de clusters por exercício (o enunciado original é marcado como template)"""
+        exercises = {}
+        for (lista_name, ex_num), groups in sorted(self.groups.items()):
+            template = file_fingerprint(LISTAS_DIR / lista_name / f"ex{ex_num:02d}" / "main.cpp")
+            repos = {fingerprint: [ex_dir.parents[2].name for ex_dir in dirs] for fingerprint, dirs in groups.items()}
+            exercises[f"{lista_name}/ex{ex_num:02d}"] = cluster_report(
+                repos, self.sources[(lista_name, ex_num)], template, threshold)
+        return {'reused': self.hits, 'exercises': exercises}
+
+def find_repos(repos_dir: Path) -> List[Path]:
+    """Lista os checkouts de alunos (subdiretórios que têm listas/)"""
+    return sorted(path for path in repos_dir.iterdir() if (path / LISTAS_DIR).is_dir())
+
+async def compile_exercise_async(ex_dir: Path, limiter: Limiter,
+                                 cache: Optional[CompileCache] = None,
+                                 pch: bool = False,
+                                 profile: str = DEFAULT_PROFILE) -> Tuple[bool, str]:
+    """Versão assíncrona de run_tests.compile_exercise"""
+    bin_dir = ex_dir / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    
+    main_cpp = ex_dir / "main.cpp"
+    exercise_bin = bin_dir / PROFILE_BINARIES[profile]
+    flags = BUILD_PROFILES[profile]
+    
+    if not main_cpp.exists():
+        return False, f"Arquivo {main_cpp} não encontrado"
+    
+    key = None
+    if cache is not None:
+        key = cache_key(main_cpp.read_bytes(), CXX, flags)
+        if cache.fetch(key, exercise_bin):
+            return True, "Compilação reaproveitada do cache"
+    
+    async with limiter.compile():
+        # O PCH de cada conjunto de includes é compilado uma vez, fora do loop de eventos
+        extra = await asyncio.to_thread(pch_flags, main_cpp.read_bytes(), CXX, flags) if pch else []
+        proc = await asyncio.create_subprocess_exec(
+            CXX, *flags, *extra, str(main_cpp), "-o", str(exercise_bin),
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(proc.communicate(), COMPILE_TIMEOUT)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return False, "Timeout na compilação"
+    
+    if proc.returncode != 0:
+        return False, f"Erro de compilação:\n{stderr.decode('utf-8', errors='replace')}"
+    if cache is not None:
+        cache.store(key, exercise_bin)
+    return True, "Compilação bem-sucedida"
+
+async def run_test_async(exercise_bin: Path, test: Dict, limiter: Limiter,
+                         limits: Optional[Dict] = None) -> Tuple[bool, str, float, str]:
+    """Versão assíncrona de run_tests.run_test (mesmos vereditos e comparação)"""
+    timeout = test.get('timeout', DEFAULT_TIMEOUT)
+    try:
+        comparator = comparator_for(test)
+    except PayloadError as e:
+        return False, f"ERRO: {str(e)}", 0.0, VERDICT_RE
+    limits = {**sandbox.DEFAULT_LIMITS, **limits} if limits is not None else None
+    output_cap = limits['output_kb'] * 1024 if limits else None
+    
+    async with limiter.execute():
+        start = time.perf_counter()
+        try:
+            # Entrada em arquivo vai direto como stdin; o descritor é do filho depois do fork
+            with (open_input(test) or nullcontext()) as input_file:
+                proc = await asyncio.create_subprocess_exec(
+                    str(exercise_bin),
+                    stdin=asyncio.subprocess.PIPE if input_file is None else input_file,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                    preexec_fn=sandbox.limit_resources(limits, timeout) if limits else os.setsid
+                )
+        except (OSError, PayloadError) as e:
+            return False, f"ERRO: {str(e)}", 0.0, VERDICT_RE
+        
+        stdout = bytearray()
+        stderr = bytearray()
+        
+        async def write_input():
+            if proc.stdin is None:
+                return
+            try:
+                proc.stdin.write(test['input'].encode('utf-8'))
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+        
+        async def read_errors():
+            while chunk := await proc.stderr.read(sandbox.CHUNK_SIZE):
+                stderr.extend(chunk[:sandbox.STDERR_LIMIT - len(stderr)])
+        
+        async def read_output():
+            size = 0
+            while chunk := await proc.stdout.read(sandbox.CHUNK_SIZE):
+                size += len(chunk)
+                stdout.extend(chunk[:sandbox.CAPTURE_LIMIT - len(stdout)])
+                if output_cap is not None and size > output_cap:
+                    return sandbox.VERDICT_OLE
+                if not comparator.feed(chunk):
+                    return VERDICT_WA
+            await proc.wait()
+            return None
+        
+        helpers = [asyncio.ensure_future(write_input()), asyncio.ensure_future(read_errors())]
+        try:
+            killed_for = await asyncio.wait_for(read_output(), timeout)
+        except asyncio.TimeoutError:
+            killed_for = sandbox.VERDICT_TLE
+        
+        if killed_for:
+            sandbox.kill_group(proc)
+        await proc.wait()
+        elapsed = time.perf_counter() - start
+        # Qualquer processo que tenha sobrado no grupo também é encerrado
+        sandbox.kill_group(proc)
+        await asyncio.gather(*helpers, return_exceptions=True)
+    
+    actual_output = stdout.decode('utf-8', errors='replace').strip()
+    if killed_for == sandbox.VERDICT_TLE and limits is None:
+        return False, "TIMEOUT", timeout, killed_for
+    
+    verdict = killed_for
+    if verdict is None and limits is not None:
+        verdict = sandbox.classify_exit(proc.returncode, 0, limits, stderr.decode('utf-8', errors='replace'))
+        verdict = None if verdict == sandbox.VERDICT_OK else verdict
+    if verdict:
+        return False, actual_output or verdict, elapsed, verdict
+    
+    matched = comparator.finish()
+    return matched, actual_output, elapsed, VERDICT_AC if matched else VERDICT_WA
+
+async def grade_exercise(repo: Path, lista_name: str, exercise: Dict, limiter: Limiter,
+                         cache: Optional[CompileCache] = None,
+                         limits: Optional[Dict] = None,
+                         pch: bool = False) -> Dict:
+    """Compila e testa um exercício de um repositório (mesmo formato do run_tests)"""
+    ex_num = exercise['number']
+    ex_dir = repo / LISTAS_DIR / lista_name / f"ex{ex_num:02d}"
+    
+    results = {
+        'repo': repo.name,
+        'lista': lista_name,
+        'exercise': ex_num,
+        'title': exercise.get('title', f'Exercício {ex_num}'),
+        'compilation': {'success': False, 'message': ''},
+        'tests': [],
+        'passed': 0,
+        'total': 0
+    }
+    
+    if not ex_dir.is_dir():
+        results['compilation']['message'] = f"Diretório {ex_dir} não encontrado"
+        return results
+    
+    success, message = await compile_exercise_async(ex_dir, limiter, cache, pch)
+    results['compilation'] = {'success': success, 'message': message}
+    count('compile_ok' if success else 'compile_failed')
+    
+    if not success:
+        return results
+    
+    # O @timeout vale o da cópia do professor, não o que o aluno deixou no fonte
+    timeout = exercise_timeout(exercise, LISTAS_DIR / lista_name / f"ex{ex_num:02d}" / "main.cpp")
+    tests = with_timeouts(exercise.get('tests', []), timeout)
+    
+    # O build otimizado só é feito se algum teste de desempenho o pedir
+    builds = {DEFAULT_PROFILE: (success, message)}
+    for profile in sorted({test_profile(exercise, test) for test in tests} - {DEFAULT_PROFILE}):
+        builds[profile] = await compile_exercise_async(ex_dir, limiter, cache, pch, profile)
+    
+    async def run(test):
+        profile = test_profile(exercise, test)
+        if not builds[profile][0]:
+            return False, builds[profile][1], 0.0, VERDICT_RE
+        return await run_test_async(ex_dir / "bin" / PROFILE_BINARIES[profile], test, limiter, limits)
+    
+    outcomes = await asyncio.gather(*(run(test) for test in tests))
+    
+    for test, (success, actual, elapsed, verdict) in zip(tests, outcomes):
+        results['tests'].append({
+            'name': test['name'],
+            'input': payload_label(test, 'input'),
+            'expected': payload_label(test, 'expected'),
+            'success': success,
+            'actual': actual,
+            'time': elapsed,
+            'verdict': verdict,
+        })
+        count(f'verdict_{verdict}')
+        count('tests_passed' if success else 'tests_failed')
+        results['total'] += 1
+        if success:
+            results['passed'] += 1
+    
+    return results
+
+async def grade_repo(repo: Path, jobs: List[Tuple[str, Dict]], limiter: Limiter, report, store: ResultsWriter,
+                     cache: Optional[CompileCache] = None,
+                     limits: Optional[Dict] = None,
+                     dedup: Optional[Deduplicator] = None,
+                     pch: bool = False) -> Dict:
+    """Corrige todos os exercícios de um repositório, gravando cada um ao terminar"""
+    summary = {'repo': repo.name, 'complete': 0, 'exercises': len(jobs), 'passed': 0, 'total': 0}
+    
+    def grade(lista_name, exercise):
+        coro = lambda: grade_exercise(repo, lista_name, exercise, limiter, cache, limits, pch)
+        if dedup is None:
+            return coro()
+        ex_dir = repo / LISTAS_DIR / lista_name / f"ex{exercise['number']:02d}"
+        return dedup.grade(ex_dir, lista_name, exercise['number'], coro)
+    
+    tasks = [grade(lista_name, exercise) for lista_name, exercise in jobs]
+    
+    for task in asyncio.as_completed(tasks):
+        result = await task
+        report.write(json.dumps(result, ensure_ascii=False) + '\n')
+        report.flush()
+        store.add(result)
+        summary['passed'] += result['passed']
+        summary['total'] += result['total']
+        if result['total'] > 0 and result['passed'] == result['total']:
+            summary['complete'] += 1
+    
+    return summary
+
+async def grade_all(repos: List[Path], jobs: List[Tuple[str, Dict]], limiter_args: Tuple[int, int, int],
+                    report_path: Path, results_path: Path, cache: Optional[CompileCache] = None,
+                    limits: Optional[Dict] = None,
+                    dedup: Optional[Deduplicator] = None,
+                    pch: bool = False) -> List[Dict]:
+    """Corrige todos os repositórios e imprime cada um assim que termina"""
+    limiter = Limiter(*limiter_args)
+    summaries = []
+    
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    store = ResultsWriter(results_path)
+    with open(report_path, 'w', encoding='utf-8') as report:
+        tasks = [grade_repo(repo, jobs, limiter, report, store, cache, limits, dedup, pch) for repo in repos]
+        for task in asyncio.as_completed(tasks):
+            summary = await task
+            summaries.append(summary)
+            print(f"[{len(summaries)}/{len(repos)}] {summary['repo']}: "
+                  f"{summary['complete']}/{summary['exercises']} exercícios, "
+                  f"{summary['passed']}/{summary['total']} testes")
+    store.close()
+    
+    return sorted(summaries, key=lambda summary: summary['repo'])
+
+def print_summary(summaries: List[Dict]):
+    """Imprime a tabela final por repositório"""
+    print("\n" + "="*70)
+    print("RESULTADO DA TURMA")
+    print("="*70)
+    
+    for summary in summaries:
+        print(f"{summary['repo'][:40]:<40} {summary['complete']:3d}/{summary['exercises']:<3d} exercícios"
+              f"  {summary['passed']:4d}/{summary['total']:<4d} testes")
+    
+    complete = sum(1 for s in summaries if s['exercises'] > 0 and s['complete'] == s['exercises'])
+    print("\n" + "="*70)
+    print(f"RESUMO: {complete}/{len(summaries)} repositório(s) com todos os exercícios completos")
+    print("="*70)
+
+def print_clusters(clusters: Dict, limit: int = 5):
+    """Resume o relatório de deduplicação: maiores grupos de submissões idênticas"""
+    print(f"\nDeduplicação: {clusters['reused']} correção(ões) reaproveitada(s)")
+    for name, exercise in clusters['exercises'].items():
+        shared = [cluster for cluster in exercise['clusters'] if cluster['size'] > 1]
+        print(f"   {name}: {exercise['distinct']} fonte(s) distinto(s) em {exercise['submissions']} submissão(ões)"
+              f", {len(exercise['similar'])} par(es) parecido(s)")
+        for cluster in shared[:limit]:
+            label = " (template)" if cluster['template'] else ""
+            print(f"      {cluster['size']:3d} idênticos{label}: {', '.join(cluster['repos'][:6])}"
+                  f"{'...' if cluster['size'] > 6 else ''}")
+
+def main():
+    """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Corrige vários repositórios de alunos em paralelo')
+    parser.add_argument('repos_dir', type=Path, help='Diretório com um checkout por aluno')
+    parser.add_argument('--lista', help='Corrigir apenas lista específica (ex: lista01)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Subprocessos simultâneos no total (padrão: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--compile-jobs', type=int, default=os.cpu_count() or 1,
+                        help='Compilações simultâneas (padrão: número de núcleos)')
+    parser.add_argument('--exec-jobs', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Execuções de teste simultâneas')
+    parser.add_argument('--report', type=Path, default=DEFAULT_REPORT,
+                        help='Relatório combinado, um exercício por linha (JSON)')
+    parser.add_argument('--no-dedup', action='store_true',
+                        help='Corrige cada submissão separadamente, mesmo com fontes idênticos')
+    parser.add_argument('--results', type=Path, default=DEFAULT_RESULTS,
+                        help='Arquivo colunar para o results_store.py (JUnit, CSV por aluno)')
+    parser.add_argument('--clusters', type=Path, default=DEFAULT_CLUSTERS,
+                        help='Relatório de submissões idênticas e parecidas (JSON)')
+    parser.add_argument('--similarity', type=float, default=DEFAULT_SIMILARITY,
+                        help=f'Similaridade mínima para apontar um par parecido (padrão: {DEFAULT_SIMILARITY})')
+    parser.add_argument('--no-cache', action='store_true', help='Recompila tudo, ignorando o cache de compilação')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='Tamanho máximo do cache de compilação em MB')
+    parser.add_argument('--pch', action='store_true',
+                        help='Compila com cabeçalho pré-compilado para os includes da biblioteca padrão')
+    parser.add_argument('--sandbox', action='store_true',
+                        help='Executa os binários com limites de CPU, memória, processos e saída')
+    parser.add_argument('--memory-limit', type=int, default=sandbox.DEFAULT_LIMITS['memory_mb'],
+                        help='Limite de memória por teste em MB (com --sandbox)')
+    parser.add_argument('--output-limit', type=int, default=sandbox.DEFAULT_LIMITS['output_kb'],
+                        help='Limite de saída por teste em KB (com --sandbox)')
+    args = parser.parse_args()
+    
+    if not args.repos_dir.is_dir():
+        print(f"Diretório {args.repos_dir} não encontrado")
+        sys.exit(1)
+    
+    # Os testes vêm do repositório do professor (diretório atual)
+    if args.lista:
+        test_files = [TEMP_DIR / f"{args.lista}_with_tests.json"]
+    else:
+        test_files = sorted(TEMP_DIR.glob("*_with_tests.json"))
+    test_files = [test_file for test_file in test_files if test_file.exists()]
+    
+    if not test_files:
+        print("Nenhum teste encontrado. Execute primeiro: make process-pdfs")
+        return
+    
+    jobs = []
+    for test_file in test_files:
+        with open(test_file, 'r', encoding='utf-8') as f:
+            lista_data = json.load(f)
+        for exercise in lista_data['exercises']:
+            jobs.append((lista_data['lista_name'], exercise))
+    
+    repos = find_repos(args.repos_dir)
+    if not repos:
+        print(f"Nenhum repositório com {LISTAS_DIR}/ encontrado em {args.repos_dir}")
+        return
+    
+    print(f"Corrigindo {len(repos)} repositório(s) x {len(jobs)} exercício(s)...")
+    
+    # Um cache só para a turma: fontes idênticos compilam uma vez
+    cache = None if args.no_cache else CompileCache(max_bytes=args.cache_size * 1024 * 1024)
+    limits = None
+    if args.sandbox:
+        limits = {'memory_mb': args.memory_limit, 'output_kb': args.output_limit}
+    limiter_args = (max(1, args.concurrency), max(1, args.compile_jobs), max(1, args.exec_jobs))
+    dedup = None if args.no_dedup else Deduplicator()
+    
+    with span('grade_all', repos=len(repos), exercises=len(jobs)):
+        summaries = asyncio.run(grade_all(repos, jobs, limiter_args, args.report, args.results, cache, limits, dedup, args.pch))
+    
+    print_summary(summaries)
+    print(f"Relatório salvo em: {args.report} (colunar: {args.results})")
+    
+    if dedup is not None:
+        with span('clusters', cat='io'):
+            clusters = dedup.report(args.similarity)
+            with open(args.clusters, 'w', encoding='utf-8') as f:
+                json.dump(clusters, f, ensure_ascii=False, indent=2)
+        print_clusters(clusters)
+        print(f"Clusters salvos em: {args.clusters}")
+    if cache is not None:
+        print(cache.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Comparator - Compara a saída de um programa com a esperada enquanto ela é lida
+
+Cada modo recebe a saída em blocos (feed) e responde assim que a divergência
+é definitiva, para que o executor possa matar o processo sem esperar o fim:
+
+    exact   - igual após remover espaços das pontas (comportamento original)
+    lines   - linha a linha, ignorando espaços no fim das linhas e linhas
+              em branco no final
+    tokens  - token a token, qualquer quantidade de espaço entre eles
+    float   - como tokens, mas números comparados com tolerância
+    regex   - a saída (sem espaços nas pontas) deve casar inteira com a regex;
+              só é decidido no final
+"""
+
+import re
+import codecs
+from typing import List, Optional
+
+from payloads import load_payload
+
+MODES = ('exact', 'lines', 'tokens', 'float', 'regex')
+DEFAULT_TOLERANCE = 1e-6
+
+class StreamComparator:
+    """Comparador incremental; feed() devolve False na primeira divergência definitiva"""
+    
+    def __init__(self, expected: str, mode: str = 'exact', tolerance: Optional[float] = None):
+        if mode not in MODES:
+            raise ValueError(f"Modo de comparação desconhecido: {mode}")
+        self.mode = mode
+        self.tolerance = DEFAULT_TOLERANCE if tolerance is None else tolerance
+        self.mismatch = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        if mode == 'exact':
+            self._expected = expected.strip()
+            self._pos = 0
+            self._started = False
+        elif mode == 'lines':
+            self._expected_lines = expected.rstrip().split('\n')
+            self._expected_lines = [line.rstrip() for line in self._expected_lines]
+            self._line = 0
+            self._partial = ''
+            self._blank_tail = 0
+        elif mode in ('tokens', 'float'):
+            self._expected_tokens = expected.split()
+            self._token = 0
+            self._partial = ''
+        else:
+            self._pattern = re.compile(expected.strip(), re.DOTALL)
+            self._buffer: List[str] = []
+    
+    def feed(self, data) -> bool:
+        """Consome um bloco da saída (bytes ou str); False se já divergiu"""
+        if self.mismatch:
+            return False
+        text = self._decoder.decode(data) if isinstance(data, (bytes, bytearray)) else data
+        if text:
+            getattr(self, f'_feed_{self.mode}')(text)
+        return not self.mismatch
+    
+    def finish(self) -> bool:
+        """Fecha a comparação ao fim da saída; True se a saída confere"""
+        if not self.mismatch:
+            tail = self._decoder.decode(b'', final=True)
+            if tail:
+                getattr(self, f'_feed_{self.mode}')(tail)
+        if self.mismatch:
+            return False
+        return getattr(self, f'_finish_{self.mode}')()
+    
+    # exact ---------------------------------------------------------------
+    
+    def _feed_exact(self, text):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        end = self._pos + len(text)
+        if end <= len(self._expected):
+            if self._expected[self._pos:end] != text:
+                self.mismatch = True
+            self._pos = end
+            return
+        # Passou do esperado: o excedente só pode ser espaço
+        split = len(self._expected) - self._pos
+        if (self._expected[self._pos:] != text[:split]) or text[split:].strip():
+            self.mismatch = True
+        self._pos = len(self._expected)
+    
+    def _finish_exact(self):
+        return self._pos == len(self._expected)
+    
+    # lines ---------------------------------------------------------------
+    
+    def _feed_lines(self, text):
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._check_line(line.rstrip())
+            if self.mismatch:
+                return
+    
+    def _check_line(self, line):
+        if self._line >= len(self._expected_lines):
+            # Depois do esperado só são aceitas linhas em branco
+            if line:
+                self.mismatch = True
+            return
+        if not line and self._expected_lines[self._line]:
+            # Linha em branco onde se esperava conteúdo: pode ainda ser o fim
+            # da saída (linhas em branco finais são ignoradas) ou um erro
+            self._blank_tail += 1
+            return
+        if self._blank_tail or line != self._expected_lines[self._line]:
+            self.mismatch = True
+            return
+        self._line += 1
+    
+    def _finish_lines(self):
+        if self._partial.rstrip():
+            self._check_line(self._partial.rstrip())
+            self._partial = ''
+        if self.mismatch:
+            return False
+        return self._line == len(self._expected_lines)
+    
+    # tokens / float ------------------------------------------------------
+    
+    def _feed_tokens(self, text):
+        data = self._partial + text
+        tokens = data.split()
+        # O último token pode continuar no próximo bloco
+        if tokens and not data[-1].isspace():
+            self._partial = tokens.pop()
+        else:
+            self._partial = ''
+        for token in tokens:
+            self._check_token(token)
+            if self.mismatch:
+                return
+    
+    _feed_float = _feed_tokens
+    
+    def _check_token(self, token):
+        if self._token >= len(self._expected_tokens):
+            self.mismatch = True
+            return
+        expected = self._expected_tokens[self._token]
+        if token != expected and not (self.mode == 'float' and self._close(token, expected)):
+            self.mismatch = True
+            return
+        self._token += 1
+    
+    def _close(self, actual, expected):
+        try:
+            a, b = float(actual), float(expected)
+        except ValueError:
+            return False
+        return abs(a - b) <= self.tolerance * max(1.0, abs(b))
+    
+    def _finish_tokens(self):
+        if self._partial:
+            self._check_token(self._partial)
+            self._partial = ''
+        return not self.mismatch and self._token == len(self._expected_tokens)
+    
+    _finish_float = _finish_tokens
+    
+    # regex ---------------------------------------------------------------
+    
+    def _feed_regex(self, text):
+        self._buffer.append(text)
+    
+    def _finish_regex(self):
+        return self._pattern.fullmatch(''.join(self._buffer).strip()) is not None
+
+def compare_output(expected: str, actual: str, mode: str = 'exact',
+                   tolerance: Optional[float] = None) -> bool:
+    """Compara uma saída já completa usando o mesmo critério do modo incremental"""
+    comparator = StreamComparator(expected, mode, tolerance)
+    comparator.feed(actual)
+    return comparator.finish()
+
+def comparator_for(test) -> StreamComparator:
+    """Cria o comparador a partir das chaves 'comparison' e 'tolerance' de um teste"""
+    return StreamComparator(load_payload(test, 'expected'), test.get('comparison', 'exact'), test.get('tolerance'))
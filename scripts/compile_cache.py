@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Compile Cache - Cache persistente de binários compilados, endereçado por conteúdo
+"""
+
+import os
+import shutil
+import hashlib
+import subprocess
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import List
+
+CACHE_DIR = Path("temp") / "compile_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+STAMP_SUFFIX = ".key"
+
+@lru_cache(maxsize=None)
+def compiler_version(cxx: str) -> str:
+    """Retorna a versão do compilador (parte da chave do cache)"""
+    try:
+        result = subprocess.run([cxx, "--version"], capture_output=True, text=True, timeout=10)
+        return result.stdout.strip()
+    except Exception:
+        return cxx
+
+def cache_key(source: bytes, cxx: str, flags: List[str]) -> str:
+    """Calcula a chave do cache: hash do fonte, versão do compilador e flags"""
+    digest = hashlib.sha256()
+    digest.update(compiler_version(cxx).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(' '.join(flags).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(source)
+    return digest.hexdigest()
+
+class CompileCache:
+    """Armazena binários em CACHE_DIR/<chave> com despejo LRU por tamanho"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.evict()
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def is_current(self, key: str, target: Path) -> bool:
+        """Verifica se o binário em target já foi gerado com esta chave"""
+        stamp = target.with_name(target.name + STAMP_SUFFIX)
+        try:
+            return target.exists() and stamp.read_text(encoding='utf-8').strip() == key
+        except OSError:
+            return False
+
+    def fetch(self, key: str, target: Path) -> bool:
+        """Copia o binário do cache para target; retorna False se não houver"""
+        entry = self._entry(key)
+        if not self.is_current(key, target):
+            if not entry.exists():
+                self._record(hit=False)
+                return False
+            self._install(entry, target, key)
+
+        # Atualiza o mtime para que a entrada seja a mais recente no LRU
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        self._record(hit=True)
+        return True
+
+    def store(self, key: str, binary: Path):
+        """Guarda um binário recém-compilado e marca o destino com a chave"""
+        entry = self._entry(key)
+        tmp = entry.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(binary, tmp)
+        os.chmod(tmp, 0o755)
+        os.replace(tmp, entry)
+        binary.with_name(binary.name + STAMP_SUFFIX).write_text(key, encoding='utf-8')
+        self.evict()
+
+    def evict(self):
+        """Remove as entradas usadas há mais tempo até caber em max_bytes"""
+        with self._lock:
+            entries = []
+            for path in self.cache_dir.iterdir():
+                if path.suffix == '.tmp':
+                    continue
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+
+    def summary(self) -> str:
+        """Resumo de acertos/falhas para exibir ao final da execução"""
+        return f"Cache de compilação: {self.hits} reaproveitado(s), {self.misses} compilado(s)"
+
+    def _install(self, entry: Path, target: Path, key: str):
+        tmp = target.with_name(f"{target.name}.{threading.get_ident()}.tmp")
+        shutil.copyfile(entry, tmp)
+        os.chmod(tmp, 0o755)
+        os.replace(tmp, target)
+        target.with_name(target.name + STAMP_SUFFIX).write_text(key, encoding='utf-8')
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
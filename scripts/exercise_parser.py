@@ -8,158 +8,294 @@ import re
 import json
 from pathlib import Path
 
+from instrumentation import span, count
+
 TEMP_DIR = Path("temp")
 OUTPUT_DIR = Path("temp")
+PDFS_DIR = Path("pdfs")
+
+# Marcadores dos decks de slides em Markdown (presenterm)
+SLIDE_SEPARATOR = re.compile(r'^\s*<!--\s*end_slide\s*-->\s*$')
+EXERCISE_HEADING = re.compile(r'^#{1,6}\s*[Ee]xerc[ií]cio\b\s*(\d+)?\s*[:\.\-]?\s*(.*)$')
+HTML_COMMENT = re.compile(r'<!--.*?-->')
+
+# Início de exercício: "1.", "1)", "1-", "Exercício 1", "Questão 1", "Problema 1"
+# Uma única alternação garante uma passada só e nenhum início sobreposto
+EXERCISE_START = re.compile(
+    r'^[ \t]*(?:'
+    r'(?P<num>\d+)[\.\)\-]'
+    r'|(?:[Ee]xerc[ií]cio|[Qq]uest[aã]o|[Pp]roblema)\s*(?P<kw_num>\d+)\s*[:\.\-]?'
+    r')',
+    re.MULTILINE
+)
+WHITESPACE = re.compile(r'\s+')
 
 def clean_text(text):
     """Limpa e normaliza o texto"""
     # Remove múltiplos espaços
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE.sub(' ', text)
     # Remove espaços no início/fim das linhas
     lines = [line.strip() for line in text.split('\n')]
     return '\n'.join(lines)
 
+def _build_exercise(text, start_pos, end_pos, ex_num):
+    """Monta o exercício a partir do trecho text[start_pos:end_pos]"""
+    exercise_text = text[start_pos:end_pos].strip()
+    
+    # Extrai título/descrição
+    lines = exercise_text.split('\n')
+    title = lines[0] if lines else f"Exercício {ex_num}"
+    description = '\n'.join(lines[1:]) if len(lines) > 1 else ""
+    
+    # Limpa descrição
+    description = clean_text(description)
+    
+    return {
+        'number': ex_num,
+        'title': title,
+        'description': description,
+        'raw_text': exercise_text
+    }
+
 def identify_exercises(text):
-    """Identifica exercícios no texto usando padrões comuns"""
-    exercises = []
-    
-    # Padrões para identificar exercícios
-    # Exemplo: "1.", "Exercício 1", "Questão 1", etc.
-    patterns = [
-        r'(?:^|\n)\s*(\d+)[\.\)\-]\s*',  # 1. ou 1) ou 1-
-        r'(?:^|\n)\s*[Ee]xerc[ií]cio\s*(\d+)\s*[:\.\-]?\s*',
-        r'(?:^|\n)\s*[Qq]uest[aã]o\s*(\d+)\s*[:\.\-]?\s*',
-        r'(?:^|\n)\s*[Pp]roblema\s*(\d+)\s*[:\.\-]?\s*',
-    ]
-    
-    # Encontra todas as posições de início de exercício
-    matches = []
-    for pattern in patterns:
-        for match in re.finditer(pattern, text):
-            matches.append((match.start(), int(match.group(1)), match.end()))
-    
-    # Ordena por posição
-    matches.sort(key=lambda x: x[0])
-    
-    # Extrai cada exercício
-    for i, (start_pos, ex_num, end_pos) in enumerate(matches):
-        # Fim deste exercício = início do próximo ou fim do texto
-        if i + 1 < len(matches):
-            end_pos = matches[i + 1][0]
-        else:
-            end_pos = len(text)
-        
-        exercise_text = text[start_pos:end_pos].strip()
-        
-        # Extrai título/descrição
-        lines = exercise_text.split('\n')
-        title = lines[0] if lines else f"Exercício {ex_num}"
-        description = '\n'.join(lines[1:]) if len(lines) > 1 else ""
+    """Identifica exercícios no texto em uma única passada, gerando um por vez"""
+    current = None  # (início, número, fim do cabeçalho) do exercício em aberto
+    
+    for match in EXERCISE_START.finditer(text):
+        ex_num = int(match.group('num') or match.group('kw_num'))
         
-        # Limpa descrição
-        description = clean_text(description)
+        # "Exercício 1" seguido de "1." na linha de baixo é o mesmo exercício
+        if current and current[1] == ex_num and not text[current[2]:match.start()].strip():
+            continue
         
-        exercises.append({
-            'number': ex_num,
-            'title': title,
-            'description': description,
-            'raw_text': exercise_text
-        })
+        if current:
+            yield _build_exercise(text, current[0], match.start(), current[1])
+        current = (match.start(), ex_num, match.end())
     
-    return exercises
+    if current:
+        yield _build_exercise(text, current[0], len(text), current[1])
 
-def extract_problem_type(description):
-    """Tenta identificar o tipo de problema"""
-    description_lower = description.lower()
+def _markdown_slide_exercise(slide_lines, number):
+    """Converte um slide em exercício se ele tiver um título '# Exercício'"""
+    for i, line in enumerate(slide_lines):
+        heading = EXERCISE_HEADING.match(line.strip())
+        if heading:
+            break
+    else:
+        return None
     
-    types = []
+    if heading.group(1):
+        number = int(heading.group(1))
     
-    # Padrões para tipos de problemas
-    if any(word in description_lower for word in ['soma', 'subtração', 'multiplicação', 'divisão', 'média', 'área', 'perímetro', 'volume']):
-        types.append('matematica')
+    body = [HTML_COMMENT.sub('', line).rstrip() for line in slide_lines[i + 1:]]
+    body = [line for line in body if line.strip()]
     
-    if any(word in description_lower for word in ['string', 'texto', 'palavra', 'caractere', 'concatenar', 'inverter']):
-        types.append('string')
+    title = heading.group(2).strip() or (body[0].strip() if body else f"Exercício {number}")
+    raw_text = '\n'.join(body)
     
-    if any(word in description_lower for word in ['vetor', 'array', 'lista', 'matriz', 'matriz', 'elemento']):
-        types.append('array')
-    
-    if any(word in description_lower for word in ['condição', 'se', 'senão', 'if', 'else', 'switch']):
-        types.append('condicional')
+    return {
+        'number': number,
+        'title': title,
+        'description': clean_text(raw_text),
+        'raw_text': raw_text
+    }
+
+def iter_markdown_exercises(lines):
+    """Percorre um deck Markdown linha a linha e gera um exercício por slide"""
+    slide = []
+    number = 0
+    in_front_matter = False
     
-    if any(word in description_lower for word in ['loop', 'laço', 'for', 'while', 'repetir', 'iterar']):
-        types.append('repeticao')
+    for line_num, line in enumerate(lines):
+        # Ignora o front matter YAML (--- ... ---) no topo do arquivo
+        if line_num == 0 and line.strip() == '---':
+            in_front_matter = True
+            continue
+        if in_front_matter:
+            in_front_matter = line.strip() != '---'
+            continue
+        
+        if not SLIDE_SEPARATOR.match(line):
+            slide.append(line.rstrip('\n'))
+            continue
+        
+        exercise = _markdown_slide_exercise(slide, number + 1)
+        if exercise:
+            number = exercise['number']
+            yield exercise
+        slide = []
     
-    if any(word in description_lower for word in ['função', 'procedimento', 'recursivo', 'recursão']):
-        types.append('funcao')
+    exercise = _markdown_slide_exercise(slide, number + 1)
+    if exercise:
+        yield exercise
+
+# Tipos de problema, na ordem de prioridade usada pelo test_generator
+PROBLEM_TYPE_RULES = {
+    'matematica': ['soma*', 'somar', 'subtração', 'multiplicação', 'divisão', 'média', 'área', 'perímetro', 'volume'],
+    'string': ['string*', 'texto*', 'palavra*', 'caractere*', 'concaten*', 'invert*'],
+    'array': ['vetor*', 'array*', 'lista', 'listas', 'matriz', 'matrizes', 'elemento*'],
+    'condicional': ['condição', 'condições', 'se', 'senão', 'if', 'else', 'switch'],
+    'repeticao': ['loop*', 'laço*', 'for', 'while', 'repet*', 'iter*', 'percorr*'],
+    'funcao': ['função', 'funções', 'procedimento*', 'recursiv*', 'recursão'],
+    'struct': ['struct*', 'classe*', 'objeto*', 'registro*'],
+    'arquivo': ['arquivo*', 'file*', 'ler arquivo', 'escrever arquivo'],
+}
+
+# Dicas de entrada/saída (viram has_input/has_output no JSON)
+IO_LABELS = ('has_input', 'has_output')
+IO_HINT_RULES = {
+    'has_input': ['leia', 'ler', 'entrada', 'input', 'digit*'],
+    'has_output': ['imprim*', 'escrev*', 'saída', 'output', 'mostr*', 'exib*'],
+}
+
+class KeywordClassifier:
+    """Classifica textos por palavras inteiras com uma única regex pré-compilada"""
     
-    if any(word in description_lower for word in ['struct', 'classe', 'objeto', 'registro']):
-        types.append('struct')
+    def __init__(self, rules):
+        # rules: {rótulo: [palavras]}; 'palavra*' casa também como prefixo
+        self.labels = list(rules)
+        lookaheads = []
+        first_letters = set()
+        for i, words in enumerate(rules.values()):
+            words = [w.lower() for w in words]
+            first_letters.update(w[0] for w in words)
+            terms = [re.escape(w[:-1]) + r'\w*' if w.endswith('*') else re.escape(w) for w in words]
+            terms.sort(key=len, reverse=True)
+            # Um lookahead opcional por rótulo: a mesma palavra (ou frase, como
+            # 'ler arquivo') conta para todos os rótulos que a contêm
+            lookaheads.append(rf"(?:(?=(?P<g{i}>{'|'.join(terms)})\b))?")
+        # O lookahead da primeira letra descarta rápido as palavras que não interessam
+        first = ''.join(re.escape(c) for c in sorted(first_letters))
+        self.pattern = re.compile(rf'\b(?=[{first}])' + ''.join(lookaheads))
     
-    if any(word in description_lower for word in ['arquivo', 'file', 'ler arquivo', 'escrever arquivo']):
-        types.append('arquivo')
+    def classify(self, text):
+        """Retorna o conjunto de rótulos encontrados no texto"""
+        found = set()
+        for match in self.pattern.finditer(text.lower()):
+            found.update(self.labels[int(name[1:])] for name, value in match.groupdict().items()
+                         if value is not None)
+        return found
+
+def load_rules(path):
+    """Carrega uma tabela de regras em JSON ({"problem_types": {...}, "io_hints": {...}})"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('problem_types', PROBLEM_TYPE_RULES), data.get('io_hints', IO_HINT_RULES)
+
+def build_classifier(problem_types=None, io_hints=None):
+    """Monta o classificador com tipos de problema e dicas de entrada/saída juntos"""
+    rules = dict(problem_types or PROBLEM_TYPE_RULES)
+    rules.update(io_hints or IO_HINT_RULES)
+    return KeywordClassifier(rules)
+
+CLASSIFIER = build_classifier()
+
+def extract_problem_type(description, classifier=None):
+    """Tenta identificar o tipo de problema"""
+    classifier = classifier or CLASSIFIER
+    return _problem_types(classifier.classify(description), classifier)
+
+def _problem_types(found, classifier):
+    """Filtra os rótulos de tipo de problema, na ordem da tabela"""
+    types = [label for label in classifier.labels if label in found and label not in IO_LABELS]
     
     if not types:
         types.append('geral')
     
     return types
 
-def parse_lista(lista_name, raw_text):
-    """Parseia uma lista completa"""
-    print(f"\nAnalisando: {lista_name}")
-    
-    exercises = identify_exercises(raw_text)
-    
+def parse_exercises(lista_name, exercises, classifier=None):
+    """Classifica os exercícios identificados e monta a estrutura do _parsed.json"""
     parsed_data = {
         'lista_name': lista_name,
-        'total_exercises': len(exercises),
-        'exercises': []
+        'total_exercises': 0,
+        'exercises': list(iter_parsed_exercises(exercises, classifier))
     }
     
+    parsed_data['total_exercises'] = len(parsed_data['exercises'])
+    return parsed_data
+
+def iter_parsed_exercises(exercises, classifier=None):
+    """Classifica os exercícios um a um, à medida que são identificados"""
+    classifier = classifier or CLASSIFIER
+    
     for ex in exercises:
-        problem_types = extract_problem_type(ex['description'])
+        # Uma única passada do classificador por exercício
+        found = classifier.classify(ex['description'])
+        problem_types = _problem_types(found, classifier)
         
         parsed_ex = {
             'number': ex['number'],
             'title': ex['title'],
             'description': ex['description'],
             'problem_types': problem_types,
-            'has_input': any(word in ex['description'].lower() for word in ['leia', 'entrada', 'input', 'digite']),
-            'has_output': any(word in ex['description'].lower() for word in ['imprima', 'escreva', 'saída', 'output', 'mostre']),
+            'has_input': 'has_input' in found,
+            'has_output': 'has_output' in found,
         }
         
-        parsed_data['exercises'].append(parsed_ex)
         print(f"  Exercício {ex['number']}: {ex['title'][:50]}... (tipos: {', '.join(problem_types)})")
+        yield parsed_ex
+
+def parse_lista(lista_name, raw_text, classifier=None):
+    """Parseia uma lista completa"""
+    print(f"\nAnalisando: {lista_name}")
     
-    return parsed_data
+    return parse_exercises(lista_name, identify_exercises(raw_text), classifier)
+
+def parse_markdown(lista_name, md_path, classifier=None):
+    """Parseia um deck de slides Markdown direto, sem passar pela extração de PDF"""
+    print(f"\nAnalisando: {lista_name} (Markdown)")
+    
+    with open(md_path, 'r', encoding='utf-8') as f:
+        return parse_exercises(lista_name, iter_markdown_exercises(f), classifier)
 
 def main():
     """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Identifica exercícios nos textos extraídos')
+    parser.add_argument('--rules', help='Tabela de palavras-chave em JSON (problem_types/io_hints)')
+    args = parser.parse_args()
+    
+    classifier = build_classifier(*load_rules(args.rules)) if args.rules else CLASSIFIER
+    
+    # Decks Markdown têm prioridade sobre o texto extraído de um PDF homônimo
+    md_files = sorted(PDFS_DIR.glob("*.md"))
+    md_names = {md_file.stem for md_file in md_files}
+    
     # Encontra todos os arquivos de texto extraídos
-    raw_files = sorted(TEMP_DIR.glob("*_raw.txt"))
+    raw_files = [f for f in sorted(TEMP_DIR.glob("*_raw.txt"))
+                 if f.stem.replace('_raw', '') not in md_names]
     
-    if not raw_files:
+    if not raw_files and not md_files:
         print(f"Nenhum arquivo de texto encontrado em {TEMP_DIR}/")
         print("Execute primeiro: python3 scripts/pdf_processor.py")
         return
     
-    print(f"Encontrados {len(raw_files)} arquivo(s) para analisar")
+    print(f"Encontrados {len(raw_files) + len(md_files)} arquivo(s) para analisar")
     
+    OUTPUT_DIR.mkdir(exist_ok=True)
     all_listas = []
     
-    for raw_file in raw_files:
-        lista_name = raw_file.stem.replace('_raw', '')
-        
-        with open(raw_file, 'r', encoding='utf-8') as f:
-            raw_text = f.read()
-        
-        parsed_data = parse_lista(lista_name, raw_text)
+    sources = [(f.stem.replace('_raw', ''), f) for f in raw_files] + [(f.stem, f) for f in md_files]
+    
+    for lista_name, source_file in sources:
+        with span('parse', lista=lista_name, source=source_file.suffix):
+            if source_file.suffix == '.md':
+                parsed_data = parse_markdown(lista_name, source_file, classifier)
+            else:
+                with open(source_file, 'r', encoding='utf-8') as f:
+                    raw_text = f.read()
+                
+                parsed_data = parse_lista(lista_name, raw_text, classifier)
         all_listas.append(parsed_data)
+        count('exercises', parsed_data['total_exercises'])
         
         # Salva dados parseados
         output_file = OUTPUT_DIR / f"{lista_name}_parsed.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(parsed_data, f, ensure_ascii=False, indent=2)
+        with span('write_json', cat='io', file=str(output_file)):
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(parsed_data, f, ensure_ascii=False, indent=2)
         print(f"  Dados salvos em: {output_file}")
     
     print(f"\n{'='*50}")
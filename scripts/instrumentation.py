@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Instrumentation - Medição de tempo e recursos compartilhada pelos scripts
+
+Com a variável PIPELINE_TRACE apontando para um arquivo, cada script anexa a
+ele um evento por trecho medido (formato de evento do Chrome trace, um JSON
+por linha) com tempo monotônico, CPU dos processos filhos e, quando o trecho
+eleva o pico de RSS dos filhos (resource.getrusage(RUSAGE_CHILDREN)), o novo
+pico, além dos contadores de cada etapa.
+Sem a variável, as medições não fazem nada.
+
+Uso do arquivo gerado:
+    python3 scripts/instrumentation.py temp/trace.jsonl            # resumo
+    python3 scripts/instrumentation.py temp/trace.jsonl --chrome t.json
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import resource
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+TRACE_ENV = "PIPELINE_TRACE"
+
+# perf_counter é monotônico mas tem origem arbitrária; o deslocamento alinha
+# no mesmo eixo os eventos de processos diferentes
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+
+def _now_us():
+    return (_EPOCH_OFFSET + time.perf_counter()) * 1e6
+
+class Tracer:
+    """Registra trechos medidos e contadores em um arquivo de trace"""
+    
+    def __init__(self, path=None, process_name=None):
+        self.path = Path(path) if path else None
+        self.process_name = process_name or Path(sys.argv[0]).stem or 'python'
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._emit({'name': 'process_name', 'ph': 'M', 'args': {'name': self.process_name}})
+            atexit.register(self.flush)
+    
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get(TRACE_ENV))
+    
+    @property
+    def enabled(self):
+        return self.path is not None
+    
+    @contextmanager
+    def span(self, name, cat='stage', **args):
+        """Mede um trecho: tempo de parede, CPU dos filhos e novo pico de RSS, se houver"""
+        if not self.enabled:
+            yield args
+            return
+        
+        start = _now_us()
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        try:
+            yield args
+        finally:
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            # Com vários trechos em paralelo (run_tests --jobs) a CPU dos
+            # filhos de trechos simultâneos se mistura
+            args['child_cpu_s'] = round(
+                (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime), 6)
+            # ru_maxrss dos filhos é o maior de todo o processo até aqui: só
+            # diz algo sobre este trecho quando sobe durante ele
+            if after.ru_maxrss > before.ru_maxrss:
+                args['children_new_peak_rss_kb'] = after.ru_maxrss
+            self._emit({'name': name, 'cat': cat, 'ph': 'X', 'ts': start,
+                        'dur': _now_us() - start, 'args': args})
+    
+    def count(self, name, n=1):
+        """Incrementa um contador da etapa (gravado ao final do processo)"""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += n
+    
+    def flush(self):
+        """Grava os contadores e o uso de recursos do próprio processo"""
+        if not self.enabled:
+            return
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        with self._lock:
+            counters = dict(self.counters)
+            self.counters.clear()
+        counters['self_cpu_s'] = round(usage.ru_utime + usage.ru_stime, 6)
+        counters['self_max_rss_kb'] = usage.ru_maxrss
+        self._emit({'name': self.process_name, 'cat': 'counters', 'ph': 'C',
+                    'ts': _now_us(), 'args': counters})
+    
+    def _emit(self, event):
+        event.setdefault('pid', os.getpid())
+        event.setdefault('tid', threading.get_ident() % 2**31)
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        # Uma escrita com O_APPEND por evento: processos diferentes não se misturam
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+TRACER = Tracer.from_env()
+span = TRACER.span
+count = TRACER.count
+
+def load_events(path):
+    """Lê os eventos de um trace (um JSON por linha)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize(events):
+    """Agrega os trechos por nome: total, chamadas e máximo (em ms)"""
+    totals = defaultdict(list)
+    for event in events:
+        if event.get('ph') == 'X':
+            totals[(event.get('cat', ''), event['name'])].append(event['dur'] / 1000)
+    rows = [(cat, name, sum(d), len(d), max(d)) for (cat, name), d in totals.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+def main():
+    """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Resume ou converte um trace do pipeline')
+    parser.add_argument('trace', type=Path, help='Arquivo gerado com PIPELINE_TRACE')
+    parser.add_argument('--chrome', type=Path, help='Salva no formato do chrome://tracing / Perfetto')
+    parser.add_argument('--top', type=int, default=20, help='Quantidade de linhas no resumo')
+    args = parser.parse_args()
+    
+    events = load_events(args.trace)
+    
+    if args.chrome:
+        with open(args.chrome, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        print(f"Trace salvo em: {args.chrome}")
+    
+    print(f"\n{'categoria':<10} {'trecho':<32} {'total ms':>10} {'chamadas':>9} {'máx ms':>9}")
+    for cat, name, total, calls, longest in summarize(events)[:args.top]:
+        print(f"{cat:<10} {name[:32]:<32} {total:10.1f} {calls:9d} {longest:9.1f}")
+    
+    for event in events:
+        if event.get('ph') == 'C':
+            values = ', '.join(f"{k}={v}" for k, v in event['args'].items())
+            print(f"\n[{event['name']}] {values}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Payloads - Entradas e saídas grandes de testes em arquivos à parte
+
+Um teste com input ou expected acima de INLINE_LIMIT não leva o texto no
+_with_tests.json nem no autograding.json: o texto vai para
+testdata/<hash[:2]>/<hash>.txt e o teste guarda o caminho e o sha256 em
+input_file/input_sha256 (ou expected_file/expected_sha256). O nome é o
+próprio hash, então casos repetidos ocupam um arquivo só e regenerar os
+testes não reescreve nada que não mudou.
+
+Na hora de rodar, a entrada é aberta e passada como stdin do processo (o
+mesmo que `./exercise < arquivo`), sem passar por uma string do Python.
+"""
+
+import os
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+PAYLOAD_DIR = Path("testdata")
+INLINE_LIMIT = 4 * 1024
+FIELDS = ('input', 'expected')
+
+class PayloadError(ValueError):
+    """Arquivo de payload ausente ou com conteúdo diferente do hash registrado"""
+
+def payload_digest(data: bytes) -> str:
+    """sha256 do conteúdo, usado como nome do arquivo"""
+    return hashlib.sha256(data).hexdigest()
+
+def store_payload(text: str) -> Dict[str, str]:
+    """Grava o texto em testdata/ (se ainda não existir) e devolve caminho e hash"""
+    data = text.encode('utf-8')
+    digest = payload_digest(data)
+    path = PAYLOAD_DIR / digest[:2] / f"{digest}.txt"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Grava em arquivo temporário: outra thread ou processo pode estar gravando o mesmo hash
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return {'file': path.as_posix(), 'sha256': digest}
+
+def externalize(test: Dict, limit: int = INLINE_LIMIT) -> Dict:
+    """Move input/expected grandes do teste para arquivos; os pequenos ficam no JSON"""
+    test = dict(test)
+    for field in FIELDS:
+        text = test.get(field)
+        if text is None or len(text.encode('utf-8')) <= limit:
+            continue
+        stored = store_payload(text)
+        del test[field]
+        test[f'{field}_file'] = stored['file']
+        test[f'{field}_sha256'] = stored['sha256']
+    return test
+
+def payload_path(test: Dict, field: str) -> Optional[Path]:
+    """Arquivo do campo, ou None se o texto estiver no próprio teste"""
+    name = test.get(f'{field}_file')
+    return Path(name) if name else None
+
+def load_payload(test: Dict, field: str) -> str:
+    """Texto do campo, lido do arquivo (e conferido pelo hash) quando necessário"""
+    path = payload_path(test, field)
+    if path is None:
+        return test[field]
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        raise PayloadError(f"{path}: {e.strerror}") from e
+    if test.get(f'{field}_sha256') and payload_digest(data) != test[f'{field}_sha256']:
+        raise PayloadError(f"{path}: conteúdo não confere com o sha256 do teste")
+    return data.decode('utf-8')
+
+def open_input(test: Dict):
+    """Arquivo de entrada aberto para usar como stdin, ou None se a entrada for inline"""
+    path = payload_path(test, 'input')
+    if path is None:
+        return None
+    try:
+        return open(path, 'rb')
+    except OSError as e:
+        raise PayloadError(f"{path}: {e.strerror}") from e
+
+def payload_label(test: Dict, field: str) -> str:
+    """Texto curto para relatórios: o próprio valor ou o caminho do arquivo"""
+    path = payload_path(test, field)
+    if path is None:
+        return test[field]
+    return f"<{path.as_posix()}>"
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+PCH - Cabeçalho pré-compilado para os includes da biblioteca padrão
+
+Quase todo o tempo de compilação de um exercício vai para o parse de
+<iostream>, <string>, <vector>, <algorithm> e <cmath>. Com --pch, o
+run_tests e o classroom_grader compilam uma vez um cabeçalho pré-compilado
+com os includes que o fonte faz antes de qualquer código e o reaproveitam em
+todos os exercícios com o mesmo conjunto de includes. Há um cabeçalho por
+compilador, flags e conjunto de includes, em temp/pch/<chave>/.
+
+Fontes com qualquer outra coisa antes dos includes (#define, #pragma, código)
+são compilados sem PCH: uma macro definida antes do include mudaria o
+conteúdo do cabeçalho. O binário gerado é o mesmo, então o cache de
+compilação e o banco de resultados usam a mesma chave com e sem PCH.
+
+Relatório de tempos por arquivo, sem e com PCH:
+    python3 scripts/pch.py --lista lista01
+"""
+
+import os
+import re
+import time
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from compile_cache import cache_key, compiler_version
+from source_dedup import normalize_source
+
+PCH_DIR = Path("temp") / "pch"
+PCH_HEADER = "std.h"
+INCLUDE_PATTERN = re.compile(r'#\s*include\s*<([\w./+-]+)>')
+
+_lock = threading.Lock()
+_builds: Dict[str, Optional[Path]] = {}
+
+def leading_includes(source: str) -> Tuple[str, ...]:
+    """Includes <...> do início do fonte, antes de qualquer outra diretiva ou código"""
+    headers = []
+    for line in normalize_source(source).split('\n'):
+        if not line:
+            continue
+        match = INCLUDE_PATTERN.fullmatch(line)
+        if match is None:
+            break
+        headers.append(match.group(1))
+    return tuple(sorted(set(headers)))
+
+def pch_suffix(cxx: str) -> str:
+    """Extensão que o compilador procura ao lado do cabeçalho de -include"""
+    return ".pch" if 'clang' in compiler_version(cxx).lower() else ".gch"
+
+def build_pch(headers: Tuple[str, ...], cxx: str, flags: List[str]) -> Optional[Path]:
+    """Compila (uma vez por processo e por chave) o cabeçalho; None se falhar"""
+    header_source = ''.join(f"#include <{header}>\n" for header in headers)
+    key = cache_key(header_source.encode('utf-8'), cxx, flags)
+    
+    with _lock:
+        if key in _builds:
+            return _builds[key]
+        
+        pch_dir = PCH_DIR / key[:16]
+        header = pch_dir / PCH_HEADER
+        compiled = pch_dir / (PCH_HEADER + pch_suffix(cxx))
+        if not compiled.exists():
+            pch_dir.mkdir(parents=True, exist_ok=True)
+            header.write_text(header_source, encoding='utf-8')
+            # Compila em arquivo temporário: outro processo pode estar lendo o atual
+            tmp = compiled.with_name(f"{compiled.name}.{os.getpid()}.tmp")
+            try:
+                result = subprocess.run(
+                    [cxx, *flags, "-x", "c++-header", str(header), "-o", str(tmp)],
+                    capture_output=True, text=True, timeout=120
+                )
+            except (subprocess.TimeoutExpired, OSError):
+                result = None
+            if result is None or result.returncode != 0:
+                tmp.unlink(missing_ok=True)
+                _builds[key] = None
+                return None
+            os.replace(tmp, compiled)
+        
+        _builds[key] = header
+        return header
+
+def pch_flags(source: bytes, cxx: str, flags: List[str]) -> List[str]:
+    """Flags extras para compilar o fonte com o PCH dos seus includes ([] se não der)"""
+    headers = leading_includes(source.decode('utf-8', errors='replace'))
+    if not headers:
+        return []
+    header = build_pch(headers, cxx, flags)
+    if header is None:
+        return []
+    return ["-include", str(header.resolve())]
+
+def time_compile(main_cpp: Path, cxx: str, flags: List[str], output: Path) -> Tuple[bool, float]:
+    """Compila e mede o tempo de parede"""
+    start = time.perf_counter()
+    result = subprocess.run([cxx, *flags, str(main_cpp), "-o", str(output)], capture_output=True, timeout=120)
+    return result.returncode == 0, time.perf_counter() - start
+
+def main():
+    """Função principal"""
+    import argparse
+    import tempfile
+    from run_tests import CXX, BUILD_PROFILES, DEFAULT_PROFILE, LISTAS_DIR
+    
+    parser = argparse.ArgumentParser(description='Compara o tempo de compilação de cada exercício sem e com PCH')
+    parser.add_argument('--lista', help='Medir apenas lista específica (ex: lista01)')
+    parser.add_argument('--dir', type=Path, default=LISTAS_DIR, help=f'Diretório das listas (padrão: {LISTAS_DIR})')
+    parser.add_argument('--profile', choices=sorted(BUILD_PROFILES), default=DEFAULT_PROFILE,
+                        help=f'Perfil de compilação (padrão: {DEFAULT_PROFILE})')
+    args = parser.parse_args()
+    flags = BUILD_PROFILES[args.profile]
+    
+    sources = sorted(args.dir.glob(f"{args.lista or '*'}/ex*/main.cpp"))
+    if not sources:
+        print(f"Nenhum main.cpp encontrado em {args.dir}/")
+        return
+    
+    # Primeiro os PCH, fora da medição: são compilados uma vez e reaproveitados
+    start = time.perf_counter()
+    extra = {main_cpp: pch_flags(main_cpp.read_bytes(), CXX, flags) for main_cpp in sources}
+    pch_time = time.perf_counter() - start
+    print(f"PCH: {len({tuple(flags) for flags in extra.values() if flags})} cabeçalho(s) em {pch_time:.2f}s")
+    
+    print(f"\n{'arquivo':<40} {'sem PCH':>9} {'com PCH':>9} {'ganho':>7}")
+    total_before = total_after = 0.0
+    with tempfile.TemporaryDirectory(prefix="pch-") as tmp:
+        output = Path(tmp) / "exercise"
+        for main_cpp in sources:
+            ok, before = time_compile(main_cpp, CXX, flags, output)
+            if not ok:
+                print(f"{str(main_cpp)[:40]:<40} erro de compilação")
+                continue
+            after = before
+            if extra[main_cpp]:
+                ok, after = time_compile(main_cpp, CXX, [*flags, *extra[main_cpp]], output)
+            total_before += before
+            total_after += after
+            note = "" if extra[main_cpp] else "  (sem PCH: código antes dos includes)"
+            print(f"{str(main_cpp)[:40]:<40} {before:8.2f}s {after:8.2f}s {before / after:6.1f}×{note}")
+    
+    print(f"\n{'total':<40} {total_before:8.2f}s {total_after:8.2f}s "
+          f"{total_before / max(total_after, 1e-9):6.1f}×")
+
+if __name__ == "__main__":
+    main()
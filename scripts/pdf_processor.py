@@ -1,121 +1,305 @@
 #!/usr/bin/env python3
 """
 PDF Processor - Extrai texto de PDFs usando OCR ou texto selecionável
+
+Os backends (PyMuPDF, pdf2image/PIL/pytesseract) só são importados quando um
+PDF precisa deles: uma execução sem PDFs, ou só com páginas já em cache,
+não paga o custo dessas importações.
 """
 
 import os
 import sys
 import glob
+import json
+import shutil
+import hashlib
+import importlib.util
+from functools import lru_cache
 from pathlib import Path
 
-try:
-    import fitz  # PyMuPDF
-    PYMUPDF_AVAILABLE = True
-except ImportError:
-    PYMUPDF_AVAILABLE = False
-    print("Aviso: PyMuPDF não instalado. Usando OCR para todos os PDFs.")
-
-try:
-    from pdf2image import convert_from_path
-    from PIL import Image
-    import pytesseract
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
-    print("Aviso: pdf2image/pytesseract não instalados. OCR indisponível.")
+from instrumentation import span, count
 
 PDFS_DIR = Path("pdfs")
 TEMP_DIR = Path("temp")
+PAGE_CACHE_DIR = TEMP_DIR / "pdf_cache"
+MANIFEST_FILE = PAGE_CACHE_DIR / "manifest.json"
+MIN_PAGE_TEXT = 20  # Abaixo disso a página não tem camada de texto útil
+OCR_DPI = 300
+OCR_WORKERS = os.cpu_count() or 1
+OCR_MEMORY_MB = 1024  # Orçamento para páginas rasterizadas em memória ao mesmo tempo
 
-def extract_text_with_pymupdf(pdf_path):
-    """Extrai texto usando PyMuPDF (para PDFs com texto selecionável)"""
-    text = ""
-    try:
-        doc = fitz.open(pdf_path)
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text += f"\n--- PÁGINA {page_num + 1} ---\n"
-            text += page.get_text()
-        doc.close()
-        return text
-    except Exception as e:
-        print(f"Erro ao extrair texto de {pdf_path}: {e}")
-        return None
+@lru_cache(maxsize=None)
+def pymupdf_available():
+    """Verifica se o PyMuPDF está instalado, sem importá-lo"""
+    return importlib.util.find_spec("fitz") is not None
 
-def extract_text_with_ocr(pdf_path):
-    """Extrai texto usando OCR (para PDFs com imagens)"""
-    if not OCR_AVAILABLE:
-        print(f"OCR não disponível para {pdf_path}")
-        return None
+@lru_cache(maxsize=None)
+def ocr_available():
+    """Verifica se pdf2image, PIL e pytesseract estão instalados, sem importá-los"""
+    return all(importlib.util.find_spec(name) is not None for name in ("pdf2image", "PIL", "pytesseract"))
+
+@lru_cache(maxsize=None)
+def load_pymupdf():
+    """Importa o PyMuPDF na primeira vez em que um PDF precisa dele"""
+    with span('import_fitz', cat='import'):
+        import fitz
+    return fitz
+
+@lru_cache(maxsize=None)
+def load_ocr():
+    """Importa pdf2image e pytesseract na primeira vez em que uma página precisa de OCR"""
+    with span('import_ocr', cat='import'):
+        import pdf2image
+        import pytesseract
+    return pdf2image, pytesseract
+
+def backend_warnings():
+    """Avisos sobre backends ausentes (exibidos só quando há PDFs a processar)"""
+    warnings = []
+    if not pymupdf_available():
+        warnings.append("Aviso: PyMuPDF não instalado. Usando OCR para todos os PDFs.")
+    if not ocr_available():
+        warnings.append("Aviso: pdf2image/pytesseract não instalados. OCR indisponível.")
+    return warnings
+
+def file_hash(path):
+    """Calcula o SHA-256 do conteúdo de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest():
+    """Carrega o mapa nome do PDF -> hash da última extração"""
+    if MANIFEST_FILE.exists():
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest):
+    """Salva o mapa nome do PDF -> hash da última extração"""
+    PAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+def page_cache_file(pdf_digest, page_num):
+    """Arquivo de cache de uma página (chave: hash do PDF + número da página)"""
+    return PAGE_CACHE_DIR / pdf_digest / f"page_{page_num:04d}.txt"
+
+def ocr_batch_size(memory_mb=OCR_MEMORY_MB, workers=OCR_WORKERS, dpi=OCR_DPI):
+    """Calcula quantas páginas cada worker rasteriza por vez dentro do orçamento de memória"""
+    # Página A4 em RGB: (8.27 x 11.69 pol * dpi)^2 * 3 bytes
+    page_mb = (8.27 * dpi) * (11.69 * dpi) * 3 / (1024 * 1024)
+    return max(1, int(memory_mb / (page_mb * max(1, workers))))
+
+def page_ranges(page_nums, batch_size):
+    """Agrupa páginas em intervalos contíguos de no máximo batch_size páginas"""
+    ranges = []
+    for page_num in sorted(page_nums):
+        if ranges and ranges[-1][1] == page_num - 1 and ranges[-1][1] - ranges[-1][0] + 1 < batch_size:
+            ranges[-1][1] = page_num
+        else:
+            ranges.append([page_num, page_num])
+    return [tuple(r) for r in ranges]
+
+def _ocr_page_range(task):
+    """Rasteriza e faz OCR de um intervalo de páginas (executado em um worker)"""
+    pdf_path, first, last, dpi = task
+    pdf2image, pytesseract = load_ocr()
+    images = pdf2image.convert_from_path(pdf_path, dpi=dpi, first_page=first, last_page=last)
+    texts = []
+    for i, image in enumerate(images):
+        texts.append((first + i, pytesseract.image_to_string(image, lang='por')))
+        image.close()
+    return texts
+
+def ocr_pages(pdf_path, page_nums, workers=OCR_WORKERS, memory_mb=OCR_MEMORY_MB):
+    """Faz OCR das páginas indicadas em paralelo, rasterizando um intervalo por vez"""
+    if not page_nums or not ocr_available():
+        return {}
+    
+    batch_size = ocr_batch_size(memory_mb, workers, OCR_DPI)
+    tasks = [(str(pdf_path), first, last, OCR_DPI) for first, last in page_ranges(page_nums, batch_size)]
+    results = {}
     
-    text = ""
     try:
-        print(f"Convertendo {pdf_path} para imagens...")
-        images = convert_from_path(pdf_path, dpi=300)
-        
-        for i, image in enumerate(images):
-            print(f"  Processando página {i + 1}/{len(images)}...")
-            page_text = pytesseract.image_to_string(image, lang='por')
-            text += f"\n--- PÁGINA {i + 1} ---\n"
-            text += page_text
-        
-        return text
+        if workers <= 1 or len(tasks) == 1:
+            for batch in map(_ocr_page_range, tasks):
+                results.update(batch)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+                for batch in executor.map(_ocr_page_range, tasks):
+                    results.update(batch)
+                    print(f"  OCR: {len(results)}/{len(page_nums)} página(s)")
     except Exception as e:
         print(f"Erro no OCR de {pdf_path}: {e}")
-        return None
+    
+    return results
+
+def count_pages(pdf_path):
+    """Conta as páginas do PDF com o backend disponível"""
+    if pymupdf_available():
+        with load_pymupdf().open(pdf_path) as doc:
+            return len(doc)
+    if ocr_available():
+        pdf2image, _ = load_ocr()
+        return pdf2image.pdfinfo_from_path(pdf_path)['Pages']
+    return 0
 
-def process_pdf(pdf_path):
-    """Processa um PDF e extrai o texto"""
+def cached_page_count(pdf_path, pdf_digest):
+    """Número de páginas guardado junto do cache (evita abrir o PDF sem necessidade)"""
+    count_file = PAGE_CACHE_DIR / pdf_digest / "pages"
+    try:
+        return int(count_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        pass
+    
+    page_count = count_pages(pdf_path)
+    if page_count:
+        count_file.parent.mkdir(parents=True, exist_ok=True)
+        count_file.write_text(str(page_count), encoding='utf-8')
+    return page_count
+
+def extract_pages(pdf_path, pdf_digest, ocr_workers=OCR_WORKERS, ocr_memory_mb=OCR_MEMORY_MB):
+    """Extrai o texto página a página, reaproveitando o cache e usando OCR só onde falta texto"""
+    pages = {}
+    needs_ocr = []
+    stats = {'cached': 0, 'text': 0, 'ocr': 0}
+    doc = None
+    
+    try:
+        page_count = cached_page_count(pdf_path, pdf_digest)
+        for page_num in range(1, page_count + 1):
+            cache_file = page_cache_file(pdf_digest, page_num)
+            if cache_file.exists():
+                pages[page_num] = cache_file.read_text(encoding='utf-8')
+                stats['cached'] += 1
+                continue
+            
+            # O documento só é aberto na primeira página que não está no cache
+            if doc is None and pymupdf_available():
+                doc = load_pymupdf().open(pdf_path)
+            page_text = doc[page_num - 1].get_text() if doc is not None else ''
+            pages[page_num] = page_text
+            if len(page_text.strip()) >= MIN_PAGE_TEXT:
+                stats['text'] += 1
+                save_cached_page(pdf_digest, page_num, page_text)
+            else:
+                needs_ocr.append(page_num)
+    finally:
+        if doc is not None:
+            doc.close()
+    
+    # Sem OCR a página fica com o pouco texto que houver, mas não é cacheada
+    with span('ocr', cat='ocr', file=str(pdf_path), pages=len(needs_ocr)):
+        ocr_texts = ocr_pages(pdf_path, needs_ocr, ocr_workers, ocr_memory_mb)
+    for page_num, page_text in ocr_texts.items():
+        pages[page_num] = page_text
+        stats['ocr'] += 1
+        save_cached_page(pdf_digest, page_num, page_text)
+    
+    return [pages[num] for num in range(1, page_count + 1)], stats
+
+def save_cached_page(pdf_digest, page_num, page_text):
+    """Grava o texto de uma página no cache"""
+    cache_file = page_cache_file(pdf_digest, page_num)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(page_text, encoding='utf-8')
+
+def process_pdf(pdf_path, manifest=None, ocr_workers=OCR_WORKERS, ocr_memory_mb=OCR_MEMORY_MB):
+    """Processa um PDF e extrai o texto (apenas páginas novas ou alteradas)"""
+    return extract_pdf_text(pdf_path, manifest, ocr_workers, ocr_memory_mb) is not None
+
+def extract_pdf_text(pdf_path, manifest=None, ocr_workers=OCR_WORKERS, ocr_memory_mb=OCR_MEMORY_MB,
+                     checkpoint=True):
+    """Extrai o texto de um PDF; com checkpoint também grava o _raw.txt. None se falhar"""
     pdf_name = Path(pdf_path).stem
     output_file = TEMP_DIR / f"{pdf_name}_raw.txt"
+    manifest = manifest if manifest is not None else {}
     
     print(f"\nProcessando: {pdf_path}")
     
-    # Tenta extrair texto direto primeiro
-    text = None
-    if PYMUPDF_AVAILABLE:
-        text = extract_text_with_pymupdf(pdf_path)
-        if text and len(text.strip()) > 100:  # Verifica se extraiu algo significativo
-            print(f"  Texto extraído via PyMuPDF ({len(text)} caracteres)")
-        else:
-            print(f"  Texto insuficiente, tentando OCR...")
-            text = None
+    pdf_digest = file_hash(pdf_path)
+    previous_digest = manifest.get(pdf_name)
+    if previous_digest == pdf_digest and output_file.exists():
+        print(f"  Sem alterações, mantendo {output_file}")
+        count('pdfs_unchanged')
+        with open(output_file, 'r', encoding='utf-8') as f:
+            return f.read()
     
-    # Se não conseguiu ou texto muito curto, usa OCR
-    if text is None and OCR_AVAILABLE:
-        text = extract_text_with_ocr(pdf_path)
-        if text:
-            print(f"  Texto extraído via OCR ({len(text)} caracteres)")
+    if not (pymupdf_available() or ocr_available()):
+        print(f"  FALHA ao processar {pdf_path}: nenhum backend disponível")
+        return None
+    
+    try:
+        pages, stats = extract_pages(pdf_path, pdf_digest, ocr_workers, ocr_memory_mb)
+        for source, pages_count in stats.items():
+            count(f'pages_{source}', pages_count)
+    except Exception as e:
+        print(f"Erro ao extrair texto de {pdf_path}: {e}")
+        pages, stats = [], {}
+    
+    text = ''.join(f"\n--- PÁGINA {i} ---\n{page}" for i, page in enumerate(pages, 1))
     
-    if text:
+    if text.strip():
+        print(f"  {len(pages)} página(s): {stats['cached']} do cache, "
+              f"{stats['text']} via PyMuPDF, {stats['ocr']} via OCR ({len(text)} caracteres)")
         # Salva texto extraído
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-        print(f"  Salvo em: {output_file}")
-        return True
+        if checkpoint:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f"  Salvo em: {output_file}")
+        
+        # Descarta páginas em cache da versão anterior do PDF
+        if previous_digest and previous_digest != pdf_digest:
+            shutil.rmtree(PAGE_CACHE_DIR / previous_digest, ignore_errors=True)
+        manifest[pdf_name] = pdf_digest
+        return text
     else:
         print(f"  FALHA ao processar {pdf_path}")
-        return False
+        return None
 
 def main():
     """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Extrai texto dos PDFs em pdfs/')
+    parser.add_argument('--ocr-workers', type=int, default=OCR_WORKERS,
+                        help=f'Processos usados no OCR (padrão: {OCR_WORKERS})')
+    parser.add_argument('--ocr-memory', type=int, default=OCR_MEMORY_MB,
+                        help=f'Memória máxima em MB para páginas rasterizadas (padrão: {OCR_MEMORY_MB})')
+    args = parser.parse_args()
+    
     # Cria diretório temp se não existir
     TEMP_DIR.mkdir(exist_ok=True)
     
+    # Listas que já existem como Markdown vão direto para o exercise_parser
+    md_names = {md_file.stem for md_file in PDFS_DIR.glob("*.md")}
+    
     # Encontra todos os PDFs
-    pdf_files = sorted(PDFS_DIR.glob("*.pdf"))
+    pdf_files = [pdf for pdf in sorted(PDFS_DIR.glob("*.pdf")) if pdf.stem not in md_names]
     
     if not pdf_files:
+        if md_names:
+            print(f"{len(md_names)} lista(s) em Markdown; nenhum PDF para extrair")
+            return
         print(f"Nenhum PDF encontrado em {PDFS_DIR}/")
         print("Coloque seus PDFs na pasta 'pdfs/' e execute novamente.")
         return
     
     print(f"Encontrados {len(pdf_files)} PDF(s) para processar")
+    for warning in backend_warnings():
+        print(warning)
     
+    manifest = load_manifest()
     success_count = 0
     for pdf_path in pdf_files:
-        if process_pdf(pdf_path):
-            success_count += 1
+        with span('process_pdf', file=str(pdf_path)):
+            if process_pdf(pdf_path, manifest, max(1, args.ocr_workers), args.ocr_memory):
+                success_count += 1
+    save_manifest(manifest)
     
     print(f"\n{'='*50}")
     print(f"Processamento concluído: {success_count}/{len(pdf_files)} PDFs processados")
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Perf Grader - Corrige desempenho (tempo de CPU e memória) contra a referência
+
+Para exercícios cujo referencias/<lista>/exNN/spec.json tem a seção
+"performance", gera entradas grandes na hora, em vários tamanhos, e roda a
+solução do aluno e a de referência com aquecimento e repetições. Cada tamanho
+recebe um veredito: AC se a saída confere e o tempo de CPU (mediana) e o pico
+de memória ficam dentro do orçamento (por padrão 3× o da referência), TLE ou
+MLE se estouram, WA/RE como nos testes comuns. Com os tempos de todos os
+tamanhos é estimada a classe de complexidade; se ela for pior que a exigida,
+o exercício é reprovado mesmo que cada tamanho tenha passado.
+
+    "performance": {
+      "scale": "n",
+      "sizes": [1000, 4000, 16000, 64000],
+      "complexity": "n log n",
+      "time_factor": 3,
+      "memory_factor": 3,
+      "repeat": 5,
+      "warmup": 1
+    }
+
+"scale" (obrigatório) é o nome de um valor inteiro do "input" que passa a
+valer cada um dos tamanhos; "complexity" é opcional (sem ela vale a classe estimada para a
+referência).
+"""
+
+import json
+import math
+import random
+import shutil
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from compile_cache import CompileCache, DEFAULT_MAX_BYTES
+from comparator import compare_output
+from reference_tests import REFERENCE_DIR, SPEC_FILE, DEFAULT_SEED, InputBuilder, SpecError, load_spec
+from run_tests import TEMP_DIR, LISTAS_DIR, PROFILE_BINARIES, VERDICT_AC, VERDICT_WA, compile_exercise
+from instrumentation import span, count
+import sandbox
+
+REPORT_FILE = TEMP_DIR / "performance_report.json"
+DEFAULT_PERFORMANCE = {
+    'sizes': [1000, 4000, 16000, 64000],
+    'time_factor': 3,
+    'memory_factor': 3,
+    'repeat': 5,
+    'warmup': 1,
+}
+MIN_TIME_BUDGET = 0.05  # Segundos de CPU: abaixo disso o que se mede é ruído
+MIN_MEMORY_SLACK_KB = 4 * 1024  # Folga sobre a referência (runtime do C++, buffers)
+RUN_TIMEOUT_FACTOR = 4  # Execuções além de 4× o orçamento são interrompidas
+MIN_RUN_TIMEOUT = 2
+PERF_PROFILE = 'optimized'
+MIN_GROWTH = 1.5  # O maior tamanho precisa levar 1,5× o menor para estimar a complexidade
+CLASS_MARGIN = 0.5  # Erro máximo, relativo ao da classe anterior, para subir de classe
+
+# Classes de complexidade em ordem crescente
+COMPLEXITY_CLASSES = {
+    '1': lambda n: 1.0,
+    'log n': lambda n: math.log2(n),
+    'n': lambda n: float(n),
+    'n log n': lambda n: n * math.log2(n),
+    'n^2': lambda n: float(n) ** 2,
+    'n^3': lambda n: float(n) ** 3,
+}
+# Um fator log não se distingue do ruído nos tamanhos medidos: na comparação
+# com a exigida, "log n" vale como "1" e "n log n" como "n"
+COMPLEXITY_TIERS = {'1': 0, 'log n': 0, 'n': 1, 'n log n': 1, 'n^2': 2, 'n^3': 3}
+
+def baseline_rss_kb() -> int:
+    """Pico de memória de um processo vazio, descontado das medições"""
+    # No Linux o ru_maxrss do filho inclui o que ele herdou do Python antes do exec
+    true_bin = shutil.which('true')
+    if true_bin is None:
+        return 0
+    return sandbox.execute(Path(true_bin), '', MIN_RUN_TIMEOUT, enforce_limits=False)['max_rss_kb']
+
+def measure(binary: Path, input_data: str, repeat: int, warmup: int, timeout: float) -> Dict:
+    """Roda o binário warmup + repeat vezes; devolve mediana de CPU e pico de memória"""
+    # As execuções de aquecimento carregam o binário e as bibliotecas no cache do sistema
+    for _ in range(warmup):
+        outcome = sandbox.execute(binary, input_data, timeout, enforce_limits=False)
+        if outcome['verdict'] != sandbox.VERDICT_OK or outcome['returncode'] != 0:
+            return {'verdict': outcome['verdict'], 'returncode': outcome['returncode'],
+                    'stdout': outcome['stdout'], 'cpu_time': outcome['cpu_time'], 'max_rss_kb': outcome['max_rss_kb']}
+    
+    cpu_times = []
+    max_rss_kb = 0
+    for _ in range(max(1, repeat)):
+        outcome = sandbox.execute(binary, input_data, timeout, enforce_limits=False)
+        if outcome['verdict'] != sandbox.VERDICT_OK or outcome['returncode'] != 0:
+            break
+        cpu_times.append(outcome['cpu_time'])
+        max_rss_kb = max(max_rss_kb, outcome['max_rss_kb'])
+    
+    return {
+        'verdict': outcome['verdict'],
+        'returncode': outcome['returncode'],
+        'stdout': outcome['stdout'],
+        'cpu_time': statistics.median(cpu_times) if cpu_times else outcome['cpu_time'],
+        'max_rss_kb': max_rss_kb or outcome['max_rss_kb'],
+    }
+
+def estimate_complexity(sizes: List[int], times: List[float]) -> Optional[str]:
+    """Classe que melhor explica os tempos (mínimos quadrados de t = a + c·f(n))"""
+    if len(sizes) < 3:
+        return None
+    
+    # Tempos dominados pelo início do processo não crescem de forma visível:
+    # qualquer ajuste seria ruído, então a complexidade fica indeterminada
+    smallest = times[sizes.index(min(sizes))]
+    largest = times[sizes.index(max(sizes))]
+    if largest < MIN_TIME_BUDGET or largest < MIN_GROWTH * smallest:
+        return None
+    
+    best, best_error = None, None
+    for name, f in COMPLEXITY_CLASSES.items():
+        xs = [f(n) for n in sizes]
+        mean_x, mean_t = statistics.fmean(xs), statistics.fmean(times)
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        c = sum((x - mean_x) * (t - mean_t) for x, t in zip(xs, times)) / var_x if var_x else 0.0
+        if c < 0:
+            c = 0.0
+        a = mean_t - c * mean_x
+        # Erro relativo: o maior tamanho não deve dominar o ajuste
+        error = sum(((a + c * x) - t) ** 2 / max(t, 1e-4) ** 2 for x, t in zip(xs, times))
+        # Uma classe mais alta só ganha se explicar os tempos claramente melhor
+        if best_error is None or error < best_error * CLASS_MARGIN:
+            best, best_error = name, error
+    return best
+
+def integer_names(items) -> List[str]:
+    """Nomes dos valores inteiros do "input" de um spec (inclusive dentro de list/lines)"""
+    names = []
+    for item in items:
+        if isinstance(item, list):
+            names.extend(integer_names(item))
+        elif isinstance(item, dict):
+            if 'name' in item and item.get('type', 'int') == 'int':
+                names.append(item['name'])
+            if 'item' in item:
+                names.extend(integer_names([item['item']]))
+            if 'line' in item:
+                names.extend(integer_names(item['line']))
+    return names
+
+def load_performance(path: Path) -> tuple:
+    """Lê o spec e a seção "performance", que precisa de um "scale" válido"""
+    spec = load_spec(path)
+    perf = {**DEFAULT_PERFORMANCE, **spec.get('performance', {})}
+    # Sem "scale" todos os tamanhos receberiam a mesma entrada de stress
+    if not perf.get('scale'):
+        raise SpecError(f"{path}: \"performance\" precisa de \"scale\" (o valor do input que varia com o tamanho)")
+    if perf['scale'] not in integer_names(spec['input']):
+        raise SpecError(f"{path}: \"scale\" '{perf['scale']}' não é o nome de um valor inteiro do input")
+    return spec, perf
+
+def grade_performance(lista_name: str, ex_num: int, ex_dir: Path, seed=DEFAULT_SEED,
+                      cache: Optional[CompileCache] = None) -> Dict:
+    """Mede aluno e referência em cada tamanho e dá os vereditos de desempenho"""
+    ref_dir = REFERENCE_DIR / lista_name / f"ex{ex_num:02d}"
+    spec, perf = load_performance(ref_dir / SPEC_FILE)
+    
+    results = {
+        'lista': lista_name,
+        'exercise': ex_num,
+        'compilation': {'success': False, 'message': ''},
+        'required': perf.get('complexity'),
+        'sizes': [],
+        'passed': False,
+    }
+    
+    success, message = compile_exercise(ref_dir, cache, profile=PERF_PROFILE)
+    if not success:
+        raise RuntimeError(f"Falha ao compilar a referência {ref_dir}: {message}")
+    ref_bin = ref_dir / "bin" / PROFILE_BINARIES[PERF_PROFILE]
+    
+    success, message = compile_exercise(ex_dir, cache, profile=PERF_PROFILE)
+    results['compilation'] = {'success': success, 'message': message}
+    if not success:
+        return results
+    student_bin = ex_dir / "bin" / PROFILE_BINARIES[PERF_PROFILE]
+    baseline = baseline_rss_kb()
+    
+    rng = random.Random(f"{seed}:{lista_name}:{ex_num}:performance")
+    comparison = spec.get('comparison', 'exact')
+    ref_times, student_times, measured_sizes = [], [], []
+    
+    for size in perf['sizes']:
+        input_data = InputBuilder('stress', rng, {perf['scale']: size}).build(spec)
+        
+        with span('perf_reference', cat='exec', exercise=str(ex_dir), size=size):
+            ref = measure(ref_bin, input_data, perf['repeat'], perf['warmup'], timeout=60)
+        if ref['verdict'] != sandbox.VERDICT_OK or ref['returncode'] != 0:
+            print(f"  Aviso: a referência falhou no tamanho {size} de {lista_name}/ex{ex_num:02d}")
+            continue
+        ref['max_rss_kb'] = max(ref['max_rss_kb'] - baseline, 0)
+        
+        time_budget = max(perf['time_factor'] * ref['cpu_time'], MIN_TIME_BUDGET)
+        memory_budget = max(perf['memory_factor'] * ref['max_rss_kb'], ref['max_rss_kb'] + MIN_MEMORY_SLACK_KB)
+        timeout = max(RUN_TIMEOUT_FACTOR * time_budget, MIN_RUN_TIMEOUT)
+        
+        with span('perf_student', cat='exec', exercise=str(ex_dir), size=size):
+            run = measure(student_bin, input_data, perf['repeat'], perf['warmup'], timeout)
+        run['max_rss_kb'] = max(run['max_rss_kb'] - baseline, 0)
+        
+        if run['verdict'] == sandbox.VERDICT_TLE:
+            verdict = sandbox.VERDICT_TLE
+        elif run['returncode'] != 0:
+            verdict = sandbox.VERDICT_RE
+        elif not compare_output(ref['stdout'], run['stdout'], comparison, spec.get('tolerance')):
+            verdict = VERDICT_WA
+        elif run['cpu_time'] > time_budget:
+            verdict = sandbox.VERDICT_TLE
+        elif run['max_rss_kb'] > memory_budget:
+            verdict = sandbox.VERDICT_MLE
+        else:
+            verdict = VERDICT_AC
+        count(f'perf_verdict_{verdict}')
+        
+        results['sizes'].append({
+            'size': size,
+            'verdict': verdict,
+            'cpu_time': run['cpu_time'],
+            'max_rss_kb': run['max_rss_kb'],
+            'reference_cpu_time': ref['cpu_time'],
+            'reference_max_rss_kb': ref['max_rss_kb'],
+            'time_budget': time_budget,
+            'memory_budget_kb': memory_budget,
+        })
+        ref_times.append(ref['cpu_time'])
+        if run['verdict'] == sandbox.VERDICT_OK and run['returncode'] == 0:
+            student_times.append(run['cpu_time'])
+            measured_sizes.append(size)
+    
+    results['reference_complexity'] = estimate_complexity(
+        [entry['size'] for entry in results['sizes']], ref_times)
+    results['complexity'] = estimate_complexity(measured_sizes, student_times)
+    
+    required = results['required'] or results['reference_complexity']
+    complexity_ok = (results['complexity'] is None or required is None
+                     or COMPLEXITY_TIERS[results['complexity']] <= COMPLEXITY_TIERS[required])
+    results['complexity_ok'] = complexity_ok
+    results['passed'] = bool(results['sizes']) and complexity_ok and all(
+        entry['verdict'] == VERDICT_AC for entry in results['sizes'])
+    return results
+
+def find_performance_exercises(lista: Optional[str] = None) -> List[tuple]:
+    """(lista, número) dos exercícios de referência com seção "performance" """
+    exercises = []
+    for spec_file in sorted(REFERENCE_DIR.glob(f"{lista or '*'}/ex*/{SPEC_FILE}")):
+        try:
+            has_performance = 'performance' in load_spec(spec_file)
+        except (OSError, ValueError):
+            continue
+        if has_performance:
+            exercises.append((spec_file.parent.parent.name, int(spec_file.parent.name[2:])))
+    return exercises
+
+def print_report(all_results: List[Dict]):
+    """Imprime os vereditos por tamanho e a complexidade estimada"""
+    print("\n" + "="*70)
+    print("RELATÓRIO DE DESEMPENHO")
+    print("="*70)
+    
+    for results in all_results:
+        status = "✓" if results['passed'] else "✗"
+        print(f"\n{status} {results['lista']} - Ex{results['exercise']:02d}")
+        if not results['compilation']['success']:
+            print(f"  {results['compilation']['message']}")
+            continue
+        
+        print(f"  {'n':>10} {'veredito':>9} {'CPU':>9} {'ref':>9} {'razão':>7} {'memória':>10} {'ref':>10}")
+        for entry in results['sizes']:
+            ratio = entry['cpu_time'] / max(entry['reference_cpu_time'], 1e-6)
+            print(f"  {entry['size']:>10} {entry['verdict']:>9} {entry['cpu_time']*1000:7.1f}ms "
+                  f"{entry['reference_cpu_time']*1000:7.1f}ms {ratio:6.1f}× "
+                  f"{entry['max_rss_kb']/1024:8.1f}MB {entry['reference_max_rss_kb']/1024:8.1f}MB")
+        
+        required = results['required'] or results['reference_complexity']
+        print(f"  Complexidade estimada: O({results['complexity'] or '?'}) "
+              f"(exigida: O({required or '?'}), referência: O({results['reference_complexity'] or '?'}))")
+        if not results['complexity_ok']:
+            print("  ✗ Complexidade pior que a exigida")
+    
+    passed = sum(1 for results in all_results if results['passed'])
+    print(f"\n{'='*70}")
+    print(f"DESEMPENHO: {passed}/{len(all_results)} exercício(s) dentro do orçamento")
+    print("="*70)
+
+def main():
+    """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Corrige tempo de CPU e memória contra a solução de referência')
+    parser.add_argument('--lista', help='Corrigir apenas lista específica (ex: lista01)')
+    parser.add_argument('--exercise', type=int, help='Corrigir apenas um exercício')
+    parser.add_argument('--dir', type=Path, default=LISTAS_DIR,
+                        help=f'Diretório com as soluções a corrigir (padrão: {LISTAS_DIR})')
+    parser.add_argument('--seed', default=str(DEFAULT_SEED), help='Semente das entradas geradas')
+    parser.add_argument('--no-cache', action='store_true', help='Recompila tudo, ignorando o cache de compilação')
+    args = parser.parse_args()
+    
+    exercises = [(lista, ex_num) for lista, ex_num in find_performance_exercises(args.lista)
+                 if args.exercise is None or ex_num == args.exercise]
+    if not exercises:
+        print(f"Nenhum exercício com seção \"performance\" em {REFERENCE_DIR}/*/ex*/{SPEC_FILE}")
+        return
+    
+    cache = None if args.no_cache else CompileCache(max_bytes=DEFAULT_MAX_BYTES)
+    all_results = []
+    for lista_name, ex_num in exercises:
+        ex_dir = args.dir / lista_name / f"ex{ex_num:02d}"
+        if not (ex_dir / "main.cpp").exists():
+            print(f"  {ex_dir}/main.cpp não encontrado, pulando")
+            continue
+        print(f"Medindo {lista_name}/ex{ex_num:02d}...")
+        try:
+            with span('perf_exercise', exercise=str(ex_dir)):
+                all_results.append(grade_performance(lista_name, ex_num, ex_dir, args.seed, cache))
+        except SpecError as e:
+            print(f"  Erro no spec: {e}")
+    
+    print_report(all_results)
+    
+    TEMP_DIR.mkdir(exist_ok=True)
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(all_results, f, ensure_ascii=False, indent=2)
+    print(f"Relatório salvo em: {REPORT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Pipeline - Executa todas as etapas do processamento em um único processo
+
+Encadeia em memória a extração de texto (pdf_processor), a identificação dos
+exercícios (exercise_parser), a geração de testes (test_generator) e a
+configuração do Classroom (autograding_generator). Cada exercício segue para
+a próxima etapa assim que é identificado, sem esperar a lista inteira.
+
+As saídas usadas pelas outras ferramentas (src/, temp/*_with_tests.json e
+.github/classroom/autograding.json) são sempre gravadas; os arquivos
+intermediários (_raw.txt e _parsed.json) só com --checkpoints.
+"""
+
+import json
+
+from instrumentation import span, count
+from pdf_processor import (PDFS_DIR, TEMP_DIR, OCR_WORKERS, OCR_MEMORY_MB,
+                           extract_pdf_text, load_manifest, save_manifest, backend_warnings)
+from exercise_parser import (CLASSIFIER, build_classifier, load_rules, identify_exercises,
+                             iter_markdown_exercises, iter_parsed_exercises)
+from test_generator import write_exercise, save_lista_tests
+from autograding_generator import exercise_autograding_tests, build_autograding_config, save_autograding_config
+
+def find_sources(pdfs_dir=PDFS_DIR):
+    """Lista (nome, arquivo) das listas; o Markdown tem prioridade sobre o PDF homônimo"""
+    md_files = sorted(pdfs_dir.glob("*.md"))
+    md_names = {md_file.stem for md_file in md_files}
+    pdf_files = [pdf for pdf in sorted(pdfs_dir.glob("*.pdf")) if pdf.stem not in md_names]
+    return sorted([(f.stem, f) for f in pdf_files + md_files])
+
+def source_exercises(source_file, manifest, checkpoints=False,
+                     ocr_workers=OCR_WORKERS, ocr_memory_mb=OCR_MEMORY_MB):
+    """Gera os exercícios de uma lista conforme são encontrados no arquivo"""
+    if source_file.suffix == '.md':
+        with open(source_file, 'r', encoding='utf-8') as f:
+            yield from iter_markdown_exercises(f)
+        return
+    
+    with span('process_pdf', file=str(source_file)):
+        text = extract_pdf_text(source_file, manifest, ocr_workers, ocr_memory_mb, checkpoint=checkpoints)
+    if text is not None:
+        yield from identify_exercises(text)
+
+def process_lista(lista_name, exercises, classifier=None, checkpoints=False, seed=None, output_cache=None):
+    """Classifica, gera testes e main.cpp e monta o autograding de cada exercício"""
+    lista_data = {
+        'lista_name': lista_name,
+        'total_exercises': 0,
+        'exercises': []
+    }
+    autograding_tests = []
+    
+    for exercise in iter_parsed_exercises(exercises, classifier):
+        write_exercise(lista_name, exercise, seed, output_cache=output_cache)
+        autograding_tests.extend(exercise_autograding_tests(lista_name, exercise))
+        lista_data['exercises'].append(exercise)
+    
+    lista_data['total_exercises'] = len(lista_data['exercises'])
+    count('exercises', lista_data['total_exercises'])
+    
+    if checkpoints:
+        parsed_data = dict(lista_data, exercises=[
+            {k: v for k, v in exercise.items() if k != 'tests'} for exercise in lista_data['exercises']
+        ])
+        output_file = TEMP_DIR / f"{lista_name}_parsed.json"
+        with span('write_json', cat='io', file=str(output_file)):
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(parsed_data, f, ensure_ascii=False, indent=2)
+    
+    save_lista_tests(lista_data)
+    return lista_data, autograding_tests
+
+def main():
+    """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Processa PDFs e Markdown até o autograding.json em um só processo')
+    parser.add_argument('--checkpoints', action='store_true',
+                        help='Grava também os intermediários temp/*_raw.txt e temp/*_parsed.json')
+    parser.add_argument('--rules', help='Tabela de palavras-chave em JSON (problem_types/io_hints)')
+    parser.add_argument('--ocr-workers', type=int, default=OCR_WORKERS,
+                        help=f'Processos usados no OCR (padrão: {OCR_WORKERS})')
+    parser.add_argument('--ocr-memory', type=int, default=OCR_MEMORY_MB,
+                        help=f'Memória máxima em MB para páginas rasterizadas (padrão: {OCR_MEMORY_MB})')
+    parser.add_argument('--seed', default='0',
+                        help='Semente das entradas geradas pelas soluções de referência (padrão: 0)')
+    parser.add_argument('--no-reference', action='store_true',
+                        help='Ignora referencias/ e usa só as tabelas fixas de testes')
+    args = parser.parse_args()
+    seed = None if args.no_reference else args.seed
+    
+    sources = find_sources()
+    if not sources:
+        print(f"Nenhum PDF ou Markdown encontrado em {PDFS_DIR}/")
+        print("Coloque seus PDFs na pasta 'pdfs/' e execute novamente.")
+        return
+    
+    print(f"Encontrada(s) {len(sources)} lista(s) para processar")
+    if any(source_file.suffix == '.pdf' for _, source_file in sources):
+        for warning in backend_warnings():
+            print(warning)
+    
+    TEMP_DIR.mkdir(exist_ok=True)
+    classifier = build_classifier(*load_rules(args.rules)) if args.rules else CLASSIFIER
+    manifest = load_manifest()
+    output_cache = None
+    if seed is not None:
+        from reference_tests import OutputCache
+        output_cache = OutputCache()
+    autograding_tests = []
+    total_exercises = 0
+    
+    for lista_name, source_file in sources:
+        print(f"\nAnalisando: {lista_name}")
+        with span('lista', lista=lista_name, source=source_file.suffix):
+            exercises = source_exercises(source_file, manifest, args.checkpoints,
+                                         max(1, args.ocr_workers), args.ocr_memory)
+            lista_data, lista_tests = process_lista(lista_name, exercises, classifier,
+                                                     args.checkpoints, seed, output_cache)
+        autograding_tests.extend(lista_tests)
+        total_exercises += lista_data['total_exercises']
+    
+    save_manifest(manifest)
+    
+    config = build_autograding_config(autograding_tests)
+    output_file = save_autograding_config(config)
+    
+    print(f"\n{'='*50}")
+    print(f"Processamento concluído: {len(sources)} lista(s), {total_exercises} exercício(s)")
+    print(f"Total de testes: {config['metadata']['total_tests']} -> {output_file}")
+    print(f"Próximo passo: revise os arquivos em src/ e execute 'make test'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Reference Tests - Gera testes a partir de uma solução de referência do professor
+
+Para um exercício com referencias/<lista>/exNN/main.cpp (a solução) e
+referencias/<lista>/exNN/spec.json (o formato da entrada), gera entradas
+aleatórias em três tamanhos (small, edge e stress), compila a referência uma
+vez e calcula as saídas esperadas rodando todas as entradas em lote. A mesma
+semente gera sempre os mesmos casos.
+
+Formato do spec.json:
+
+    {
+      "input": [
+        [{"type": "int", "name": "n", "min": 1, "max": {"small": 10, "stress": 100000}}],
+        [{"type": "list", "len": "n", "item": {"type": "int", "min": -1000, "max": 1000}}]
+      ],
+      "cases": {"small": 20, "edge": 10, "stress": 3}
+    }
+
+Cada item de "input" é uma linha e cada linha uma lista de valores separados
+por espaço. Tipos: int, float (digits), string (len, alphabet), choice
+(values), list (len, item, sep) e lines (count, line). Limites e tamanhos
+aceitam um número, [min, max], o nome de um valor já gerado ou um dicionário
+por tamanho. Em "edge" os valores vão para os extremos dos intervalos.
+
+As saídas da referência ficam em temp/reference_outputs/, pelo hash do fonte
+(com compilador e flags) e da entrada: regenerar os testes só roda a
+referência nas entradas novas, e nem a compila se não houver nenhuma.
+"""
+
+import os
+import json
+import random
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from compile_cache import CompileCache, cache_key
+from batch_harness import supports_batch, compile_harness, run_batch_outputs
+from payloads import payload_digest
+from run_tests import TEMP_DIR, CXX, BUILD_PROFILES, PROFILE_BINARIES, compile_exercise
+import sandbox
+
+REFERENCE_DIR = Path("referencias")
+SPEC_FILE = "spec.json"
+OUTPUT_CACHE_DIR = TEMP_DIR / "reference_outputs"
+DEFAULT_SEED = 0
+SIZES = ('small', 'edge', 'stress')
+DEFAULT_CASES = {'small': 20, 'edge': 10, 'stress': 3}
+REFERENCE_TIMEOUT = 10
+REFERENCE_PROFILE = 'optimized'  # A referência roda as entradas de stress
+REFERENCE_WORKERS = os.cpu_count() or 1
+MAX_ATTEMPTS = 5  # Tentativas por caso até achar uma entrada ainda não usada
+
+class SpecError(ValueError):
+    """Spec de entrada inválido"""
+
+def reference_dir(lista_name: str, ex_num: int) -> Path:
+    """Diretório da solução de referência de um exercício"""
+    return REFERENCE_DIR / lista_name / f"ex{ex_num:02d}"
+
+def has_reference(lista_name: str, ex_num: int) -> bool:
+    """Verifica se o exercício tem solução de referência e spec"""
+    ref_dir = reference_dir(lista_name, ex_num)
+    return (ref_dir / "main.cpp").exists() and (ref_dir / SPEC_FILE).exists()
+
+def load_spec(path: Path) -> Dict:
+    """Lê e valida o spec de entrada"""
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    if not isinstance(spec.get('input'), list):
+        raise SpecError(f"{path}: 'input' deve ser uma lista de linhas")
+    return spec
+
+class InputBuilder:
+    """Gera uma entrada a partir do spec para um tamanho"""
+    
+    def __init__(self, size: str, rng: random.Random, fixed: Optional[Dict] = None):
+        self.size = size
+        self.rng = rng
+        self.values = {}
+        self.fixed = fixed or {}
+    
+    def bounds(self, value, default=None):
+        """Resolve um limite: número, [min, max], nome de valor ou dicionário por tamanho"""
+        if isinstance(value, dict):
+            value = value.get(self.size, value.get('small', default))
+        if isinstance(value, str):
+            if value not in self.values:
+                raise SpecError(f"Valor '{value}' usado antes de ser gerado")
+            value = self.values[value]
+        if value is None:
+            value = default
+        if isinstance(value, (list, tuple)):
+            return value[0], value[1]
+        return value, value
+    
+    def pick(self, lo, hi):
+        """Sorteia um inteiro; em edge, um dos extremos"""
+        if self.size == 'edge':
+            return self.rng.choice((lo, hi))
+        return self.rng.randint(lo, hi)
+    
+    def item(self, spec: Dict) -> str:
+        kind = spec.get('type', 'int')
+        if spec.get('name') in self.fixed:
+            value = self.fixed[spec['name']]
+            text = str(value)
+        elif kind == 'int':
+            lo, _ = self.bounds(spec.get('min'), 0)
+            _, hi = self.bounds(spec.get('max'), 100)
+            value = self.pick(int(lo), int(hi))
+            text = str(value)
+        elif kind == 'float':
+            lo, _ = self.bounds(spec.get('min'), 0)
+            _, hi = self.bounds(spec.get('max'), 1)
+            value = self.rng.choice((lo, hi)) if self.size == 'edge' else self.rng.uniform(lo, hi)
+            text = f"{value:.{spec.get('digits', 2)}f}"
+        elif kind == 'string':
+            lo, hi = self.bounds(spec.get('len'), [1, 10])
+            alphabet = spec.get('alphabet', string.ascii_lowercase)
+            value = ''.join(self.rng.choice(alphabet) for _ in range(self.pick(int(lo), int(hi))))
+            text = value
+        elif kind == 'choice':
+            value = self.rng.choice(spec['values'])
+            text = str(value)
+        elif kind == 'list':
+            lo, hi = self.bounds(spec.get('len'), [1, 10])
+            length = self.pick(int(lo), int(hi))
+            value = length
+            text = spec.get('sep', ' ').join(self.item(spec['item']) for _ in range(length))
+        elif kind == 'lines':
+            lo, hi = self.bounds(spec.get('count'), [1, 10])
+            lines = self.pick(int(lo), int(hi))
+            value = lines
+            text = '\n'.join(self.line(spec['line']) for _ in range(lines))
+        else:
+            raise SpecError(f"Tipo desconhecido: {kind}")
+        
+        if 'name' in spec:
+            self.values[spec['name']] = value
+        return text
+    
+    def line(self, items: List[Dict]) -> str:
+        return ' '.join(self.item(item) for item in items)
+    
+    def build(self, spec: Dict) -> str:
+        return '\n'.join(self.line(line) for line in spec['input']) + '\n'
+
+def generate_inputs(spec: Dict, seed, counts: Optional[Dict] = None) -> List[tuple]:
+    """Gera (tamanho, entrada) sem repetições, de forma reprodutível pela semente"""
+    counts = {**DEFAULT_CASES, **spec.get('cases', {}), **(counts or {})}
+    rng = random.Random(str(seed))
+    seen = set()
+    inputs = []
+    for size in SIZES:
+        for _ in range(counts.get(size, 0)):
+            for _ in range(MAX_ATTEMPTS):
+                data = InputBuilder(size, rng).build(spec)
+                if data not in seen:
+                    seen.add(data)
+                    inputs.append((size, data))
+                    break
+    return inputs
+
+class OutputCache:
+    """Saídas da referência em OUTPUT_CACHE_DIR/<fonte>/<entrada>, endereçadas pelo hash de cada um"""
+    
+    def __init__(self, cache_dir: Path = OUTPUT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def _entry(self, source_key: str, data: str) -> Path:
+        return self.cache_dir / source_key[:32] / payload_digest(data.encode('utf-8'))
+    
+    def lookup(self, source_key: str, data: str) -> Optional[str]:
+        """Saída guardada para a entrada, ou None se ainda não foi calculada"""
+        try:
+            output = self._entry(source_key, data).read_text(encoding='utf-8')
+        except OSError:
+            output = None
+        with self._lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return output
+    
+    def store(self, source_key: str, data: str, output: str):
+        """Guarda a saída (arquivo temporário + rename: leitores nunca veem metade)"""
+        entry = self._entry(source_key, data)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(output, encoding='utf-8')
+        os.replace(tmp, entry)
+
+def reference_key(ref_dir: Path) -> str:
+    """Hash do fonte da referência (com compilador e flags) para o cache de saídas"""
+    return cache_key((ref_dir / "main.cpp").read_bytes(), CXX, BUILD_PROFILES[REFERENCE_PROFILE])
+
+def run_reference(ref_dir: Path, inputs: List[str], cache: Optional[CompileCache] = None,
+                  workers: int = REFERENCE_WORKERS,
+                  output_cache: Optional[OutputCache] = None) -> List[Optional[str]]:
+    """Saída da referência para cada entrada (None se ela falhar naquele caso)"""
+    if output_cache is None:
+        return execute_reference(ref_dir, inputs, cache, workers)
+    
+    # Só as entradas que ainda não estão no cache rodam; a referência nem é
+    # compilada se todas estiverem
+    source_key = reference_key(ref_dir)
+    results = [output_cache.lookup(source_key, data) for data in inputs]
+    missing = [i for i, output in enumerate(results) if output is None]
+    computed = execute_reference(ref_dir, [inputs[i] for i in missing], cache, workers)
+    for i, output in zip(missing, computed):
+        # Falhas não são guardadas: podem ter sido só um timeout com a máquina carregada
+        if output is not None:
+            output_cache.store(source_key, inputs[i], output)
+        results[i] = output
+    return results
+
+def execute_reference(ref_dir: Path, inputs: List[str], cache: Optional[CompileCache] = None,
+                      workers: int = REFERENCE_WORKERS) -> List[Optional[str]]:
+    """Compila a referência e a roda em todas as entradas, em lote se possível"""
+    if not inputs:
+        return []
+    
+    if supports_batch(ref_dir):
+        harness_bin = compile_harness(ref_dir, CXX, BUILD_PROFILES[REFERENCE_PROFILE], cache)
+        if harness_bin is not None:
+            frames = run_batch_outputs(harness_bin, inputs, REFERENCE_TIMEOUT * len(inputs))
+            if frames is not None:
+                return [output if code == 0 else None for output, code, _ in frames]
+    
+    # Sem lote: um processo por entrada, em paralelo
+    success, message = compile_exercise(ref_dir, cache, profile=REFERENCE_PROFILE)
+    if not success:
+        raise RuntimeError(f"Falha ao compilar a referência {ref_dir}: {message}")
+    binary = ref_dir / "bin" / PROFILE_BINARIES[REFERENCE_PROFILE]
+    
+    def run(data):
+        outcome = sandbox.execute(binary, data, REFERENCE_TIMEOUT, enforce_limits=False)
+        if outcome['verdict'] != sandbox.VERDICT_OK or outcome['returncode'] != 0:
+            return None
+        return outcome['stdout']
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(run, inputs))
+
+def generate_reference_tests(lista_name: str, ex_num: int, seed=DEFAULT_SEED,
+                             cache: Optional[CompileCache] = None,
+                             counts: Optional[Dict] = None,
+                             output_cache: Optional[OutputCache] = None) -> List[Dict]:
+    """Gera os testes de um exercício com entradas aleatórias e a saída da referência"""
+    ref_dir = reference_dir(lista_name, ex_num)
+    spec = load_spec(ref_dir / SPEC_FILE)
+    
+    # Semente por exercício: gerar uma lista não muda os casos das outras
+    inputs = generate_inputs(spec, f"{seed}:{lista_name}:{ex_num}", counts)
+    outputs = run_reference(ref_dir, [data for _, data in inputs], cache, output_cache=output_cache)
+    
+    tests = []
+    numbers = dict.fromkeys(SIZES, 0)
+    dropped = 0
+    for (size, data), output in zip(inputs, outputs):
+        if output is None:
+            dropped += 1
+            continue
+        numbers[size] += 1
+        test = {
+            'name': f"{size} {numbers[size]}",
+            'input': data,
+            'expected': output.strip(),
+            'description': f"Gerado pela referência (seed {seed}, {size})",
+        }
+        if spec.get('comparison'):
+            test['comparison'] = spec['comparison']
+        if 'tolerance' in spec:
+            test['tolerance'] = spec['tolerance']
+        tests.append(test)
+    
+    if dropped:
+        print(f"  Aviso: a referência falhou em {dropped} entrada(s) de {lista_name}/ex{ex_num:02d}; casos descartados")
+    return tests
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Results DB - Banco SQLite com os resultados dos testes
+
+Cada exercício corrigido é guardado com a chave (lista, exercício, hash do
+fonte, hash dos testes). O hash do fonte é o mesmo do cache de compilação
+(fonte, versão do compilador e flags) e o dos testes inclui os limites de
+execução, então qualquer mudança que possa alterar o veredito gera uma chave
+nova. O run_tests.py reaproveita o resultado guardado quando a chave já
+existe e registra cada execução no histórico.
+
+Consultas:
+    python3 scripts/results_db.py                      # taxa de acerto atual
+    python3 scripts/results_db.py --history --lista lista01 --exercise 3
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DB_PATH = Path("temp") / "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    lista TEXT NOT NULL,
+    exercise INTEGER NOT NULL,
+    source_hash TEXT NOT NULL,
+    tests_hash TEXT NOT NULL,
+    graded_at TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (lista, exercise, source_hash, tests_hash)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lista TEXT NOT NULL,
+    exercise INTEGER NOT NULL,
+    source_hash TEXT NOT NULL,
+    tests_hash TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    reused INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_exercise ON history (lista, exercise, id);
+"""
+
+def tests_hash(exercise: Dict, limits: Optional[Dict] = None) -> str:
+    """Hash dos testes de um exercício e de tudo que muda a forma de executá-los"""
+    payload = {
+        'tests': exercise.get('tests', []),
+        'harness': exercise.get('harness'),
+        'profile': exercise.get('profile'),
+        'timeout_ms': exercise.get('timeout_ms'),
+        'limits': limits,
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+class ResultsDB:
+    """Acesso ao banco de resultados (seguro para as threads do run_tests)"""
+    
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+    
+    def lookup(self, lista: str, exercise: int, source_hash: str, tests_hash: str) -> Optional[Dict]:
+        """Resultado guardado para esta chave, ou None se ainda não foi corrigido"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM results WHERE lista=? AND exercise=? AND source_hash=? AND tests_hash=?",
+                (lista, exercise, source_hash, tests_hash)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row['result'])
+    
+    def store(self, lista: str, exercise: int, source_hash: str, tests_hash: str, result: Dict):
+        """Guarda o resultado de uma correção nova"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (lista, exercise, source_hash, tests_hash, _now(),
+                 result['passed'], result['total'], json.dumps(result, ensure_ascii=False))
+            )
+    
+    def record(self, lista: str, exercise: int, source_hash: str, tests_hash: str,
+               result: Dict, reused: bool):
+        """Anota uma execução no histórico (corrigida agora ou reaproveitada)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO history (lista, exercise, source_hash, tests_hash, run_at, passed, total, reused)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (lista, exercise, source_hash, tests_hash, _now(),
+                 result['passed'], result['total'], int(reused))
+            )
+    
+    def history(self, lista: Optional[str] = None, exercise: Optional[int] = None,
+                limit: int = 20) -> List[sqlite3.Row]:
+        """Execuções mais recentes, filtradas por lista e exercício"""
+        query = "SELECT * FROM history WHERE (? IS NULL OR lista=?) AND (? IS NULL OR exercise=?)"
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            return self._conn.execute(query, (lista, lista, exercise, exercise, limit)).fetchall()
+    
+    def pass_rates(self, lista: Optional[str] = None) -> List[sqlite3.Row]:
+        """Por exercício: última taxa de acerto, melhor taxa e número de versões do fonte"""
+        query = """
+            SELECT lista, exercise,
+                   COUNT(*) AS runs,
+                   COUNT(DISTINCT source_hash) AS versions,
+                   MAX(CAST(passed AS REAL) / MAX(total, 1)) AS best,
+                   (SELECT CAST(h2.passed AS REAL) / MAX(h2.total, 1) FROM history h2
+                    WHERE h2.lista = h.lista AND h2.exercise = h.exercise
+                    ORDER BY h2.id DESC LIMIT 1) AS last
+            FROM history h
+            WHERE (? IS NULL OR lista=?)
+            GROUP BY lista, exercise
+            ORDER BY lista, exercise
+        """
+        with self._lock:
+            return self._conn.execute(query, (lista, lista)).fetchall()
+    
+    def summary(self) -> str:
+        """Resumo de reaproveitamento para exibir ao final da execução"""
+        return f"Banco de resultados: {self.hits} reaproveitado(s), {self.misses} corrigido(s)"
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _now() -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+def main():
+    """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Consulta o histórico de resultados dos testes')
+    parser.add_argument('--db', type=Path, default=DB_PATH, help='Arquivo do banco de resultados')
+    parser.add_argument('--lista', help='Filtrar por lista (ex: lista01)')
+    parser.add_argument('--exercise', type=int, help='Filtrar por número do exercício')
+    parser.add_argument('--history', action='store_true', help='Lista as execuções em vez da taxa de acerto')
+    parser.add_argument('--limit', type=int, default=20, help='Quantidade de execuções no histórico')
+    args = parser.parse_args()
+    
+    if not args.db.exists():
+        print(f"Banco {args.db} não encontrado. Execute primeiro: make test")
+        return
+    
+    db = ResultsDB(args.db)
+    
+    if args.history:
+        print(f"\n{'quando':<20} {'exercício':<28} {'fonte':<10} {'testes':>8}")
+        for row in db.history(args.lista, args.exercise, args.limit):
+            name = f"{row['lista']}/ex{row['exercise']:02d}"
+            reused = "reaproveitado" if row['reused'] else ""
+            print(f"{row['run_at']:<20} {name[:28]:<28} {row['source_hash'][:8]:<10} "
+                  f"{row['passed']:3d}/{row['total']:<4d}  {reused}")
+    else:
+        print(f"\n{'exercício':<32} {'execuções':>9} {'versões':>8} {'última':>8} {'melhor':>8}")
+        for row in db.pass_rates(args.lista):
+            if args.exercise is not None and row['exercise'] != args.exercise:
+                continue
+            name = f"{row['lista']}/ex{row['exercise']:02d}"
+            print(f"{name[:32]:<32} {row['runs']:9d} {row['versions']:8d} "
+                  f"{row['last']:8.0%} {row['best']:8.0%}")
+    
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Results Store - Arquivo colunar com os resultados de uma correção
+
+O run_tests.py e o classroom_grader.py gravam cada exercício assim que ele
+termina, sem acumular a execução inteira em memória. O arquivo é uma
+sequência de blocos:
+
+    STRS  strings novas do dicionário (repositório, lista, título, teste, veredito)
+    PAYL  um conteúdo (entrada, esperado, obtido ou mensagem), guardado uma vez por hash
+    ROWS  grupo de até ROW_GROUP_SIZE linhas, uma coluna (array) após a outra
+
+Cada exercício ocupa uma linha de cabeçalho (flag EXERCISE, com o resultado
+da compilação) seguida de uma linha por teste. Os renderizadores percorrem os
+grupos de linhas um a um e só leem os conteúdos que vão exibir.
+
+    python3 scripts/results_store.py                       # resumo no terminal
+    python3 scripts/results_store.py --junit temp/junit.xml --csv temp/notas.csv
+"""
+
+import csv
+import struct
+import hashlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+RESULTS_PATH = Path("temp") / "results.cols"
+MAGIC = b"GRDCOL1\n"
+BLOCK_HEADER = struct.Struct('<4sI')
+ROW_GROUP_SIZE = 4096
+NO_PAYLOAD = 0xFFFFFFFF
+
+# Flags por linha
+SUCCESS = 1
+REUSED = 2
+EXERCISE = 4
+
+# Colunas: nome, typecode do array
+COLUMNS = [
+    ('repo', 'I'),
+    ('lista', 'I'),
+    ('exercise', 'I'),
+    ('title', 'I'),
+    ('test', 'I'),
+    ('verdict', 'I'),
+    ('flags', 'B'),
+    ('time', 'f'),
+    ('input', 'I'),
+    ('expected', 'I'),
+    ('actual', 'I'),
+]
+STRING_COLUMNS = ('repo', 'lista', 'title', 'test', 'verdict')
+
+class ResultsWriter:
+    """Grava resultados de exercícios no formato colunar, em blocos"""
+    
+    def __init__(self, path: Path = RESULTS_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'wb')
+        self._file.write(MAGIC)
+        self._strings = {}
+        self._new_strings = []
+        self._payloads = {}
+        self._columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self.rows = 0
+    
+    def _block(self, kind: bytes, data: bytes):
+        self._file.write(BLOCK_HEADER.pack(kind, len(data)))
+        self._file.write(data)
+    
+    def _string(self, value: str) -> int:
+        ref = self._strings.get(value)
+        if ref is None:
+            ref = self._strings[value] = len(self._strings)
+            self._new_strings.append(value)
+        return ref
+    
+    def _payload(self, value: Optional[str]) -> int:
+        """Grava o conteúdo uma vez e devolve sua referência"""
+        if value is None:
+            return NO_PAYLOAD
+        data = value.encode('utf-8')
+        digest = hashlib.sha256(data).digest()
+        ref = self._payloads.get(digest)
+        if ref is None:
+            ref = self._payloads[digest] = len(self._payloads)
+            self._block(b'PAYL', digest + data)
+        return ref
+    
+    def _row(self, **values):
+        for name, _ in COLUMNS:
+            self._columns[name].append(values[name])
+        self.rows += 1
+        if len(self._columns['flags']) >= ROW_GROUP_SIZE:
+            self.flush()
+    
+    def add(self, result: Dict):
+        """Grava um exercício (mesmo formato de run_tests.grade_exercise)"""
+        base = {
+            'repo': self._string(result.get('repo', '')),
+            'lista': self._string(result['lista']),
+            'exercise': result['exercise'],
+            'title': self._string(result.get('title', '')),
+        }
+        compilation = result['compilation']
+        flags = EXERCISE | (SUCCESS if compilation['success'] else 0) | (REUSED if result.get('reused') else 0)
+        self._row(**base, test=self._string(''), verdict=self._string('' if compilation['success'] else 'CE'),
+                  flags=flags, time=0.0, input=NO_PAYLOAD, expected=NO_PAYLOAD,
+                  actual=NO_PAYLOAD if compilation['success'] else self._payload(compilation['message']))
+        
+        for test in result['tests']:
+            self._row(**base, test=self._string(test['name']), verdict=self._string(test.get('verdict', '')),
+                      flags=SUCCESS if test['success'] else 0, time=test.get('time', 0.0),
+                      input=self._payload(test['input']), expected=self._payload(test['expected']),
+                      actual=self._payload(test.get('actual')))
+    
+    def flush(self):
+        """Grava as strings novas e o grupo de linhas pendente"""
+        if self._new_strings:
+            self._block(b'STRS', '\0'.join(self._new_strings).encode('utf-8'))
+            self._new_strings = []
+        rows = len(self._columns['flags'])
+        if rows:
+            data = struct.pack('<I', rows) + b''.join(self._columns[name].tobytes() for name, _ in COLUMNS)
+            self._block(b'ROWS', data)
+            self._columns = {name: array(typecode) for name, typecode in COLUMNS}
+    
+    def close(self):
+        self.flush()
+        self._file.close()
+
+class ResultsReader:
+    """Lê o arquivo colunar sem carregar os conteúdos"""
+    
+    def __init__(self, path: Path = RESULTS_PATH):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{self.path} não é um arquivo de resultados")
+        self.strings: List[str] = []
+        self._payloads = array('Q')
+        self._payload_sizes = array('I')
+        self._groups = array('Q')
+        
+        # Só os cabeçalhos dos blocos são lidos; o conteúdo fica no disco
+        while True:
+            header = self._file.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                break
+            kind, length = BLOCK_HEADER.unpack(header)
+            offset = self._file.tell()
+            if kind == b'STRS':
+                self.strings.extend(self._file.read(length).decode('utf-8').split('\0'))
+                continue
+            if kind == b'PAYL':
+                self._payloads.append(offset + 32)
+                self._payload_sizes.append(length - 32)
+            elif kind == b'ROWS':
+                self._groups.append(offset)
+            self._file.seek(offset + length)
+    
+    def row_groups(self) -> Iterator[Dict[str, array]]:
+        """Cada grupo de linhas como um dicionário de colunas"""
+        for offset in self._groups:
+            self._file.seek(offset)
+            (rows,) = struct.unpack('<I', self._file.read(4))
+            group = {}
+            for name, typecode in COLUMNS:
+                column = array(typecode)
+                column.frombytes(self._file.read(rows * column.itemsize))
+                group[name] = column
+            yield group
+    
+    def rows(self) -> Iterator[Dict]:
+        """Linhas uma a uma, com as strings já resolvidas"""
+        for group in self.row_groups():
+            for i in range(len(group['flags'])):
+                row = {name: group[name][i] for name, _ in COLUMNS}
+                for name in STRING_COLUMNS:
+                    row[name] = self.strings[row[name]]
+                yield row
+    
+    def exercises(self) -> Iterator[Dict]:
+        """Agrupa as linhas por exercício (cabeçalho e testes)"""
+        current = None
+        for row in self.rows():
+            if row['flags'] & EXERCISE:
+                if current is not None:
+                    yield current
+                current = {**row, 'tests': []}
+            elif current is not None:
+                current['tests'].append(row)
+        if current is not None:
+            yield current
+    
+    def payload(self, ref: int, limit: Optional[int] = None) -> str:
+        """Conteúdo de uma referência (só os primeiros limit bytes, se dado)"""
+        if ref == NO_PAYLOAD:
+            return ''
+        size = self._payload_sizes[ref] if limit is None else min(limit, self._payload_sizes[ref])
+        self._file.seek(self._payloads[ref])
+        return self._file.read(size).decode('utf-8', errors='ignore')
+    
+    def close(self):
+        self._file.close()
+
+def exercise_counts(exercise: Dict):
+    """(passaram, total) de um exercício agrupado"""
+    tests = exercise['tests']
+    return sum(1 for test in tests if test['flags'] & SUCCESS), len(tests)
+
+def exercise_name(exercise: Dict) -> str:
+    name = f"{exercise['lista']}/ex{exercise['exercise']:02d}"
+    return f"{exercise['repo']}/{name}" if exercise['repo'] else name
+
+def render_terminal(reader: ResultsReader):
+    """Imprime o relatório de sempre do run_tests a partir do arquivo"""
+    print("\n" + "="*70)
+    print("RESULTADOS DOS TESTES")
+    print("="*70)
+    
+    total_exercises = 0
+    total_passed = 0
+    verdicts = Counter()
+    
+    for exercise in reader.exercises():
+        total_exercises += 1
+        name = exercise_name(exercise)
+        
+        # Status de compilação
+        if not exercise['flags'] & SUCCESS:
+            print(f"\n❌ {name}: ERRO DE COMPILAÇÃO")
+            print(f"   {reader.payload(exercise['actual'], 400)[:100]}")
+            continue
+        
+        # Status dos testes
+        passed, total = exercise_counts(exercise)
+        if total > 0 and passed == total:
+            total_passed += 1
+        
+        if passed == total:
+            status = "✅"
+        elif passed > 0:
+            status = "⚠️"
+        else:
+            status = "❌"
+        
+        reused = " (sem mudanças)" if exercise['flags'] & REUSED else ""
+        print(f"\n{status} {name}: {exercise['title'][:40]}{reused}")
+        print(f"   Testes: {passed}/{total} passaram")
+        
+        # Detalhes dos testes que falharam
+        for test in exercise['tests']:
+            if not test['flags'] & SUCCESS:
+                verdicts[test['verdict']] += 1
+                print(f"   ❌ {test['test']} [{test['verdict']}]:")
+                print(f"      Input: {reader.payload(test['input'], 200)[:50]}")
+                print(f"      Esperado: {reader.payload(test['expected'], 200)[:50]}")
+                print(f"      Obtido: {reader.payload(test['actual'], 200)[:50]}")
+    
+    print("\n" + "="*70)
+    print(f"RESUMO: {total_passed}/{total_exercises} exercícios completos")
+    if verdicts:
+        print("Falhas: " + ', '.join(f"{verdict}={n}" for verdict, n in sorted(verdicts.items())))
+    print("="*70)
+
+def render_junit(reader: ResultsReader, output: Path, detail: int = 1000):
+    """Grava um JUnit XML, uma testsuite por exercício"""
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n')
+        for exercise in reader.exercises():
+            name = exercise_name(exercise)
+            passed, total = exercise_counts(exercise)
+            if not exercise['flags'] & SUCCESS:
+                f.write(f'  <testsuite name={quoteattr(name)} tests="1" failures="0" errors="1">\n'
+                        f'    <testcase classname={quoteattr(name)} name="compilação">\n'
+                        f'      <error message="CE">{escape(reader.payload(exercise["actual"], detail))}</error>\n'
+                        f'    </testcase>\n  </testsuite>\n')
+                continue
+            
+            time = sum(test['time'] for test in exercise['tests'])
+            f.write(f'  <testsuite name={quoteattr(name)} tests="{total}" failures="{total - passed}" '
+                    f'errors="0" time="{time:.3f}">\n')
+            for test in exercise['tests']:
+                f.write(f'    <testcase classname={quoteattr(name)} name={quoteattr(test["test"])} '
+                        f'time="{test["time"]:.3f}"')
+                if test['flags'] & SUCCESS:
+                    f.write('/>\n')
+                    continue
+                body = (f"Esperado: {reader.payload(test['expected'], detail)}\n"
+                        f"Obtido: {reader.payload(test['actual'], detail)}")
+                f.write(f'>\n      <failure message={quoteattr(test["verdict"])}>{escape(body)}</failure>\n'
+                        f'    </testcase>\n')
+            f.write('  </testsuite>\n')
+        f.write('</testsuites>\n')
+
+def render_csv(reader: ResultsReader, output: Path):
+    """Grava um CSV com uma linha por aluno e exercício"""
+    with open(output, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['aluno', 'lista', 'exercicio', 'titulo', 'compilou', 'passaram', 'total', 'falhas'])
+        for exercise in reader.exercises():
+            passed, total = exercise_counts(exercise)
+            failures = Counter(test['verdict'] for test in exercise['tests'] if not test['flags'] & SUCCESS)
+            writer.writerow([
+                exercise['repo'] or 'local',
+                exercise['lista'],
+                exercise['exercise'],
+                exercise['title'],
+                int(bool(exercise['flags'] & SUCCESS)),
+                passed,
+                total,
+                ' '.join(f"{verdict}={n}" for verdict, n in sorted(failures.items())),
+            ])
+
+def main():
+    """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Gera relatórios a partir do arquivo colunar de resultados')
+    parser.add_argument('results', type=Path, nargs='?', default=RESULTS_PATH,
+                        help=f'Arquivo de resultados (padrão: {RESULTS_PATH})')
+    parser.add_argument('--junit', type=Path, help='Grava um relatório JUnit XML')
+    parser.add_argument('--csv', type=Path, help='Grava um CSV por aluno e exercício')
+    parser.add_argument('--quiet', action='store_true', help='Não imprime o resumo no terminal')
+    args = parser.parse_args()
+    
+    if not args.results.exists():
+        print(f"Arquivo {args.results} não encontrado. Execute primeiro: make test")
+        return
+    
+    reader = ResultsReader(args.results)
+    if not args.quiet:
+        render_terminal(reader)
+    if args.junit:
+        render_junit(reader, args.junit)
+        print(f"JUnit salvo em: {args.junit}")
+    if args.csv:
+        render_csv(reader, args.csv)
+        print(f"CSV salvo em: {args.csv}")
+    reader.close()
+
+if __name__ == "__main__":
+    main()
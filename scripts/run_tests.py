@@ -4,37 +4,75 @@ Run Tests - Executa testes localmente
 """
 
 import os
+import re
 import sys
 import json
 import subprocess
-import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Iterator, List, Dict, Tuple, Optional
+
+from compile_cache import CompileCache, cache_key, DEFAULT_MAX_BYTES
+from batch_harness import supports_batch, compile_harness, run_batch
+from instrumentation import span, count
+from comparator import comparator_for
+from payloads import open_input, payload_path, payload_label
+from results_db import ResultsDB, tests_hash, DB_PATH
+from pch import pch_flags
+from results_store import ResultsWriter, ResultsReader, RESULTS_PATH, render_terminal
+import sandbox
 
 TEMP_DIR = Path("temp")
 LISTAS_DIR = Path("listas")
+DEFAULT_JOBS = os.cpu_count() or 1
+CXX = "g++"
+CXXFLAGS = ["-std=c++17", "-Wall", "-Wextra", "-O2"]
+# Perfis de compilação: o rápido atende os testes funcionais e o otimizado só
+# é compilado quando um teste de desempenho ("profile": "optimized") o pede
+BUILD_PROFILES = {
+    'fast': ["-std=c++17", "-Wall", "-Wextra", "-O0"],
+    'optimized': CXXFLAGS,
+}
+PROFILE_BINARIES = {'fast': "exercise", 'optimized': "exercise-O2"}
+DEFAULT_PROFILE = 'fast'
+DEFAULT_TIMEOUT = 1  # Segundos, para exercícios sem @timeout
+TIMEOUT_PATTERN = re.compile(r'@timeout\s+(\d+)')
+
+# Vereditos além dos do sandbox (TLE, MLE, OLE)
+VERDICT_AC = 'AC'
+VERDICT_WA = sandbox.VERDICT_WA
+VERDICT_RE = sandbox.VERDICT_RE
 
-def compile_exercise(ex_dir: Path) -> Tuple[bool, str]:
-    """Compila um exercício e retorna sucesso/erro"""
+def compile_exercise(ex_dir: Path, cache: Optional[CompileCache] = None,
+                     pch: bool = False, profile: str = DEFAULT_PROFILE) -> Tuple[bool, str]:
+    """Compila um exercício e retorna sucesso/erro (reaproveita o cache se houver)"""
     bin_dir = ex_dir / "bin"
     bin_dir.mkdir(exist_ok=True)
     
     main_cpp = ex_dir / "main.cpp"
-    exercise_bin = bin_dir / "exercise"
+    exercise_bin = bin_dir / PROFILE_BINARIES[profile]
+    flags = BUILD_PROFILES[profile]
     
     if not main_cpp.exists():
         return False, f"Arquivo {main_cpp} não encontrado"
     
-    cmd = [
-        "g++", "-std=c++17", "-Wall", "-Wextra", "-O2",
-        str(main_cpp), "-o", str(exercise_bin)
-    ]
+    key = None
+    if cache is not None:
+        key = cache_key(main_cpp.read_bytes(), CXX, flags)
+        if cache.fetch(key, exercise_bin):
+            return True, "Compilação reaproveitada do cache"
+    
+    # Com PCH o binário é o mesmo, então a chave do cache não muda
+    extra = pch_flags(main_cpp.read_bytes(), CXX, flags) if pch else []
+    cmd = [CXX, *flags, *extra, str(main_cpp), "-o", str(exercise_bin)]
     
     try:
         result = subprocess.run(
             cmd, capture_output=True, text=True, timeout=30
         )
         if result.returncode == 0:
+            if cache is not None:
+                cache.store(key, exercise_bin)
             return True, "Compilação bem-sucedida"
         else:
             return False, f"Erro de compilação:\n{result.stderr}"
@@ -43,41 +81,106 @@ def compile_exercise(ex_dir: Path) -> Tuple[bool, str]:
     except Exception as e:
         return False, f"Erro: {str(e)}"
 
-def run_test(ex_dir: Path, test: Dict) -> Tuple[bool, str, float]:
-    """Executa um teste e retorna sucesso/saída/tempo"""
-    exercise_bin = ex_dir / "bin" / "exercise"
+def header_timeout(main_cpp: Path) -> Optional[float]:
+    """Timeout em segundos do @timeout (em ms) no cabeçalho Doxygen do main.cpp"""
+    try:
+        text = main_cpp.read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return None
+    # Só o primeiro comentário: o resto do arquivo é código do aluno
+    match = TIMEOUT_PATTERN.search(text[:text.find('*/') + 1])
+    return int(match.group(1)) / 1000 if match else None
+
+def exercise_timeout(exercise: Dict, main_cpp: Path) -> float:
+    """Timeout padrão dos testes: @timeout do main.cpp, timeout_ms do JSON ou 1s"""
+    timeout = header_timeout(main_cpp)
+    if timeout is None and 'timeout_ms' in exercise:
+        timeout = exercise['timeout_ms'] / 1000
+    return timeout or DEFAULT_TIMEOUT
+
+def with_timeouts(tests: List[Dict], timeout: float) -> List[Dict]:
+    """Aplica o timeout do exercício aos testes que não definem o próprio"""
+    return [{'timeout': timeout, **test} for test in tests]
+
+def test_profile(exercise: Dict, test: Dict) -> str:
+    """Perfil de compilação de um teste (o do teste, o do exercício ou o rápido)"""
+    return test.get('profile', exercise.get('profile', DEFAULT_PROFILE))
+
+def run_test(ex_dir: Path, test: Dict,
+             limits: Optional[Dict] = None,
+             profile: str = DEFAULT_PROFILE) -> Tuple[bool, str, float, str]:
+    """Executa um teste e retorna sucesso/saída/tempo/veredito"""
+    exercise_bin = ex_dir / "bin" / PROFILE_BINARIES[profile]
     
     if not exercise_bin.exists():
-        return False, "Binário não encontrado", 0.0
+        return False, "Binário não encontrado", 0.0, VERDICT_RE
     
-    start_time = time.time()
+    timeout = test.get('timeout', DEFAULT_TIMEOUT)
     
     try:
-        result = subprocess.run(
-            [str(exercise_bin)],
-            input=test['input'],
-            capture_output=True,
-            text=True,
-            timeout=test.get('timeout', 1)
-        )
-        
-        elapsed = time.time() - start_time
-        
-        actual_output = result.stdout.strip()
-        expected_output = test['expected'].strip()
-        
-        if actual_output == expected_output:
-            return True, actual_output, elapsed
-        else:
-            return False, actual_output, elapsed
-            
-    except subprocess.TimeoutExpired:
-        return False, "TIMEOUT", test.get('timeout', 1)
+        # A saída é conferida enquanto é lida; na primeira divergência o
+        # processo é morto. Sem limits (fora do --sandbox) só vale o timeout
+        # Entrada em arquivo vai direto como stdin do processo
+        comparator = comparator_for(test)
+        with span('exec', cat='exec', binary=str(exercise_bin), sandbox=limits is not None) as info, \
+                (open_input(test) or nullcontext()) as input_file:
+            outcome = sandbox.execute(exercise_bin, test.get('input', ''), timeout, limits,
+                                      on_stdout=comparator.feed, enforce_limits=limits is not None,
+                                      input_file=input_file)
+            info['verdict'] = outcome['verdict']
+            # Uso deste filho (wait4), ao contrário do acumulado do span
+            info['max_rss_kb'] = outcome['max_rss_kb']
+            info['cpu_time'] = round(outcome['cpu_time'], 6)
     except Exception as e:
-        return False, f"ERRO: {str(e)}", 0.0
+        return False, f"ERRO: {str(e)}", 0.0, VERDICT_RE
+    
+    actual_output = outcome['stdout'].strip()
+    verdict = outcome['verdict']
+    
+    if verdict == sandbox.VERDICT_TLE and limits is None:
+        return False, "TIMEOUT", timeout, verdict
+    if verdict != sandbox.VERDICT_OK:
+        return False, actual_output or verdict, outcome['time'], verdict
+    
+    with span('compare', cat='compare'):
+        matched = comparator.finish()
+    
+    return matched, actual_output, outcome['time'], VERDICT_AC if matched else VERDICT_WA
+
+def run_tests_for_exercise(lista_name: str, exercise: Dict,
+                           cache: Optional[CompileCache] = None,
+                           limits: Optional[Dict] = None,
+                           db: Optional[ResultsDB] = None,
+                           pch: bool = False) -> Dict:
+    """Executa todos os testes de um exercício (ou reaproveita o resultado do banco)"""
+    ex_num = exercise['number']
+    main_cpp = LISTAS_DIR / lista_name / f"ex{ex_num:02d}" / "main.cpp"
+    
+    if db is None or not main_cpp.exists():
+        return grade_exercise(lista_name, exercise, cache, limits, pch)
+    
+    # Mesmo fonte (com o mesmo compilador e flags) e mesmos testes: mesmo veredito
+    profile_flags = [flag for profile in sorted(BUILD_PROFILES) for flag in BUILD_PROFILES[profile]]
+    key = (lista_name, ex_num, cache_key(main_cpp.read_bytes(), CXX, profile_flags), tests_hash(exercise, limits))
+    stored = db.lookup(*key)
+    if stored is not None:
+        count('db_hits')
+        db.record(*key, stored, reused=True)
+        return {**stored, 'reused': True}
+    
+    results = grade_exercise(lista_name, exercise, cache, limits, pch)
+    # Timeouts (de compilação ou de teste) dependem da carga da máquina, não do fonte
+    timed_out = any(test['verdict'] == sandbox.VERDICT_TLE for test in results['tests'])
+    if results['compilation']['message'] != "Timeout na compilação" and not timed_out:
+        db.store(*key, results)
+    db.record(*key, results, reused=False)
+    return results
 
-def run_tests_for_exercise(lista_name: str, exercise: Dict) -> Dict:
-    """Executa todos os testes de um exercício"""
+def grade_exercise(lista_name: str, exercise: Dict,
+                   cache: Optional[CompileCache] = None,
+                   limits: Optional[Dict] = None,
+                   pch: bool = False) -> Dict:
+    """Compila e executa todos os testes de um exercício"""
     ex_num = exercise['number']
     ex_dir = LISTAS_DIR / lista_name / f"ex{ex_num:02d}"
     
@@ -91,27 +194,66 @@ def run_tests_for_exercise(lista_name: str, exercise: Dict) -> Dict:
         'total': 0
     }
     
-    # Compila
-    success, message = compile_exercise(ex_dir)
+    # Compila só o perfil rápido; o otimizado espera o primeiro teste que o pedir
+    with span('compile', cat='compile', exercise=str(ex_dir), profile=DEFAULT_PROFILE) as info:
+        success, message = compile_exercise(ex_dir, cache, pch)
+        info['success'] = success
     results['compilation'] = {'success': success, 'message': message}
+    count('compile_ok' if success else 'compile_failed')
     
     if not success:
         return results
+    builds = {DEFAULT_PROFILE: (success, message)}
     
     # Executa testes
-    tests = exercise.get('tests', [])
-    for test in tests:
+    tests = with_timeouts(exercise.get('tests', []), exercise_timeout(exercise, ex_dir / "main.cpp"))
+    outcomes = {}
+    # Entradas em arquivo ficam fora do lote: cada uma vira o stdin de um processo
+    batch_indices = [i for i, test in enumerate(tests)
+                     if test_profile(exercise, test) == DEFAULT_PROFILE and payload_path(test, 'input') is None]
+    if exercise.get('harness') == 'batch' and batch_indices and supports_batch(ex_dir):
+        harness_bin = compile_harness(ex_dir, CXX, BUILD_PROFILES[DEFAULT_PROFILE], cache, pch)
+        if harness_bin is not None:
+            batch_tests = [tests[i] for i in batch_indices]
+            # No modo sandbox o lote inteiro roda sob os mesmos rlimits
+            preexec_fn = None
+            if limits is not None:
+                timeout = sum(test['timeout'] for test in batch_tests) + 1
+                preexec_fn = sandbox.limit_resources({**sandbox.DEFAULT_LIMITS, **limits}, timeout)
+            with span('batch', cat='exec', exercise=str(ex_dir), tests=len(batch_tests)):
+                batch_outcomes = run_batch(harness_bin, batch_tests, preexec_fn)
+            if batch_outcomes is not None:
+                outcomes = dict(zip(batch_indices, batch_outcomes))
+            count('batch_runs' if batch_outcomes is not None else 'batch_fallbacks')
+    
+    for i, test in enumerate(tests):
         test_result = {
             'name': test['name'],
-            'input': test['input'],
-            'expected': test['expected']
+            'input': payload_label(test, 'input'),
+            'expected': payload_label(test, 'expected')
         }
         
-        success, actual, elapsed = run_test(ex_dir, test)
+        profile = test_profile(exercise, test)
+        if profile not in builds:
+            with span('compile', cat='compile', exercise=str(ex_dir), profile=profile) as info:
+                builds[profile] = compile_exercise(ex_dir, cache, pch, profile)
+                info['success'] = builds[profile][0]
+        
+        # Falhas no modo em lote são confirmadas em um processo isolado
+        if i in outcomes and outcomes[i][0]:
+            success, actual, elapsed = outcomes[i]
+            verdict = VERDICT_AC
+        elif not builds[profile][0]:
+            success, actual, elapsed, verdict = False, builds[profile][1], 0.0, VERDICT_RE
+        else:
+            success, actual, elapsed, verdict = run_test(ex_dir, test, limits, profile)
         
         test_result['success'] = success
         test_result['actual'] = actual
         test_result['time'] = elapsed
+        test_result['verdict'] = verdict
+        count(f'verdict_{verdict}')
+        count('tests_passed' if success else 'tests_failed')
         
         results['tests'].append(test_result)
         results['total'] += 1
@@ -121,51 +263,22 @@ def run_tests_for_exercise(lista_name: str, exercise: Dict) -> Dict:
     
     return results
 
-def print_results(results: List[Dict]):
-    """Imprime resultados formatados"""
-    print("\n" + "="*70)
-    print("RESULTADOS DOS TESTES")
-    print("="*70)
-    
-    total_exercises = len(results)
-    total_passed = sum(1 for r in results if r['passed'] == r['total'] and r['total'] > 0)
-    
-    for result in results:
-        lista = result['lista']
-        ex = result['exercise']
-        title = result['title']
-        
-        # Status de compilação
-        if not result['compilation']['success']:
-            print(f"\n❌ {lista}/ex{ex:02d}: ERRO DE COMPILAÇÃO")
-            print(f"   {result['compilation']['message'][:100]}")
-            continue
-        
-        # Status dos testes
-        passed = result['passed']
-        total = result['total']
-        
-        if passed == total:
-            status = "✅"
-        elif passed > 0:
-            status = "⚠️"
-        else:
-            status = "❌"
-        
-        print(f"\n{status} {lista}/ex{ex:02d}: {title[:40]}")
-        print(f"   Testes: {passed}/{total} passaram")
-        
-        # Detalhes dos testes que falharam
-        for test in result['tests']:
-            if not test['success']:
-                print(f"   ❌ {test['name']}:")
-                print(f"      Input: {test['input'][:50]}")
-                print(f"      Esperado: {test['expected'][:50]}")
-                print(f"      Obtido: {test['actual'][:50]}")
-    
-    print("\n" + "="*70)
-    print(f"RESUMO: {total_passed}/{total_exercises} exercícios completos")
-    print("="*70)
+def run_all_exercises(jobs: List[Tuple[str, Dict]], workers: int = DEFAULT_JOBS,
+                      cache: Optional[CompileCache] = None,
+                      limits: Optional[Dict] = None,
+                      db: Optional[ResultsDB] = None,
+                      pch: bool = False) -> Iterator[Dict]:
+    """Executa os exercícios em paralelo e entrega cada resultado na ordem de entrada"""
+    if workers <= 1 or len(jobs) <= 1:
+        for lista_name, exercise in jobs:
+            yield run_tests_for_exercise(lista_name, exercise, cache, limits, db, pch)
+        return
+    
+    # Cada tarefa compila e testa um exercício; o trabalho pesado fica nos
+    # subprocessos (g++ e binários), então threads bastam para ocupar os núcleos
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(lambda job: run_tests_for_exercise(*job, cache, limits, db, pch), jobs)
 
 def main():
     """Função principal"""
@@ -173,6 +286,26 @@ def main():
     
     parser = argparse.ArgumentParser(description='Executa testes localmente')
     parser.add_argument('--lista', help='Testar apenas lista específica (ex: lista01)')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f'Número de exercícios processados em paralelo (padrão: {DEFAULT_JOBS})')
+    parser.add_argument('--no-db', action='store_true',
+                        help='Corrige tudo de novo, sem consultar nem gravar o banco de resultados')
+    parser.add_argument('--db', type=Path, default=DB_PATH, help='Arquivo do banco de resultados')
+    parser.add_argument('--results', type=Path, default=RESULTS_PATH,
+                        help=f'Arquivo colunar com os resultados (padrão: {RESULTS_PATH})')
+    parser.add_argument('--no-cache', action='store_true', help='Recompila tudo, ignorando o cache de compilação')
+    parser.add_argument('--pch', action='store_true',
+                        help='Compila com cabeçalho pré-compilado para os includes da biblioteca padrão')
+    parser.add_argument('--sandbox', action='store_true',
+                        help='Executa os binários com limites de CPU, memória, processos e saída')
+    parser.add_argument('--memory-limit', type=int, default=sandbox.DEFAULT_LIMITS['memory_mb'],
+                        help='Limite de memória por teste em MB (com --sandbox)')
+    parser.add_argument('--output-limit', type=int, default=sandbox.DEFAULT_LIMITS['output_kb'],
+                        help='Limite de saída por teste em KB (com --sandbox)')
+    parser.add_argument('--max-procs', type=int, default=sandbox.DEFAULT_LIMITS['max_procs'],
+                        help='Limite de processos do usuário (RLIMIT_NPROC, com --sandbox)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='Tamanho máximo do cache de compilação em MB')
     args = parser.parse_args()
     
     # Encontra arquivos com testes
@@ -185,23 +318,51 @@ def main():
         print("Nenhum teste encontrado. Execute primeiro: make process-pdfs")
         return
     
-    all_results = []
+    jobs = []
     
     for test_file in test_files:
         if not test_file.exists():
             continue
-            
-        with open(test_file, 'r', encoding='utf-8') as f:
-            lista_data = json.load(f)
+        
+        with span('load_json', cat='io', file=str(test_file)):
+            with open(test_file, 'r', encoding='utf-8') as f:
+                lista_data = json.load(f)
         
         lista_name = lista_data['lista_name']
         print(f"\nTestando {lista_name}...")
         
         for exercise in lista_data['exercises']:
-            result = run_tests_for_exercise(lista_name, exercise)
-            all_results.append(result)
+            jobs.append((lista_name, exercise))
+    
+    cache = None if args.no_cache else CompileCache(max_bytes=args.cache_size * 1024 * 1024)
+    limits = None
+    if args.sandbox:
+        limits = {
+            'memory_mb': args.memory_limit,
+            'output_kb': args.output_limit,
+            'max_procs': args.max_procs,
+        }
+    
+    db = None if args.no_db else ResultsDB(args.db)
+    
+    # Cada exercício vai para o arquivo assim que termina; o relatório é lido de lá
+    writer = ResultsWriter(args.results)
+    with span('run_all', jobs=args.jobs, exercises=len(jobs)):
+        for result in run_all_exercises(jobs, max(1, args.jobs), cache, limits, db, args.pch):
+            writer.add(result)
+    writer.close()
     
-    print_results(all_results)
+    with span('report', cat='io'):
+        reader = ResultsReader(args.results)
+        render_terminal(reader)
+        reader.close()
+    if cache is not None:
+        print(cache.summary())
+        count('cache_hits', cache.hits)
+        count('cache_misses', cache.misses)
+    if db is not None:
+        print(db.summary())
+        db.close()
 
 if __name__ == "__main__":
     main()
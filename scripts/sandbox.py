@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Sandbox - Executa binários de alunos com limites de recursos
+
+Aplica rlimits no processo filho (CPU, espaço de endereçamento, número de
+processos, tamanho de arquivo) e lê a saída em blocos com um teto rígido,
+matando o processo assim que ele estoura algum limite. O resultado traz um
+veredito separado da comparação de saída: OK, TLE, MLE, OLE ou RE.
+
+Com um comparador incremental (on_stdout) a saída é conferida enquanto é
+lida e o processo é morto na primeira divergência definitiva (WA).
+"""
+
+import os
+import math
+import time
+import signal
+import resource
+import selectors
+import subprocess
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Optional
+
+DEFAULT_LIMITS = {
+    'memory_mb': 256,          # RLIMIT_AS
+    'output_kb': 16 * 1024,    # Teto para stdout e RLIMIT_FSIZE
+    'max_procs': 64,           # RLIMIT_NPROC (conta os processos do usuário)
+}
+
+CHUNK_SIZE = 64 * 1024
+STDERR_LIMIT = 64 * 1024
+# Com comparador a saída não precisa ficar inteira na memória, só o começo
+CAPTURE_LIMIT = 64 * 1024
+WAIT_INTERVAL = 0.005  # Segundos entre verificações do fim do processo
+EXIT_POLL_INTERVAL = 0.05  # Espera máxima no select antes de verificar se o processo terminou
+
+VERDICT_OK = 'OK'
+VERDICT_TLE = 'TLE'
+VERDICT_MLE = 'MLE'
+VERDICT_OLE = 'OLE'
+VERDICT_RE = 'RE'
+VERDICT_WA = 'WA'
+
+def limit_resources(limits: Dict, timeout: float) -> Callable[[], None]:
+    """Retorna o preexec_fn que aplica os rlimits no processo filho"""
+    cpu_seconds = max(1, math.ceil(timeout))
+    memory = limits['memory_mb'] * 1024 * 1024
+    output = limits['output_kb'] * 1024
+    
+    def apply():
+        os.setsid()
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (output, output))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if limits.get('max_procs'):
+            resource.setrlimit(resource.RLIMIT_NPROC, (limits['max_procs'], limits['max_procs']))
+    
+    return apply
+
+def kill_group(proc):
+    """Mata o processo e tudo que ele tiver criado (mesmo grupo de sessão)"""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def execute(binary: Path, input_data: str, timeout: float = 1,
+            limits: Optional[Dict] = None,
+            on_stdout: Optional[Callable[[bytes], bool]] = None,
+            enforce_limits: bool = True,
+            input_file: Optional[BinaryIO] = None) -> Dict:
+    """Executa o binário com limites e devolve saída, veredito e uso de recursos"""
+    # on_stdout recebe cada bloco da saída e, se devolver False, o processo é
+    # morto com veredito WA. Sem enforce_limits só o tempo de parede é limitado.
+    # Com input_file o arquivo vira o stdin do filho e input_data é ignorado
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    output_cap = limits['output_kb'] * 1024 if enforce_limits else None
+    capture_cap = CAPTURE_LIMIT if on_stdout is not None else output_cap
+    stdin_data = input_data.encode('utf-8') if input_file is None else b''
+    
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [str(binary)], stdin=subprocess.PIPE if input_file is None else input_file,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        preexec_fn=limit_resources(limits, timeout) if enforce_limits else os.setsid
+    )
+    
+    stdout = bytearray()
+    stdout_size = 0
+    stderr = bytearray()
+    killed_for = None
+    status = usage = exited_at = None
+    deadline = start + timeout
+    
+    with selectors.DefaultSelector() as selector:
+        selector.register(proc.stdout, selectors.EVENT_READ)
+        selector.register(proc.stderr, selectors.EVENT_READ)
+        if stdin_data:
+            os.set_blocking(proc.stdin.fileno(), False)
+            selector.register(proc.stdin, selectors.EVENT_WRITE)
+        elif proc.stdin is not None:
+            proc.stdin.close()
+        written = 0
+        
+        while len(selector.get_map()) > 0:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                if status is None:
+                    killed_for = VERDICT_TLE
+                break
+            
+            if status is None:
+                pid, wait_status, wait_usage = os.wait4(proc.pid, os.WNOHANG)
+                if pid:
+                    # O programa terminou, mas um processo criado por ele pode
+                    # estar segurando stdout: o grupo é encerrado e o que restou
+                    # nos pipes só é drenado
+                    status, usage, exited_at = wait_status, wait_usage, time.perf_counter()
+                    kill_group(proc)
+            
+            for key, _ in selector.select(min(remaining, EXIT_POLL_INTERVAL)):
+                if key.fileobj is proc.stdin:
+                    try:
+                        written += os.write(proc.stdin.fileno(), stdin_data[written:written + CHUNK_SIZE])
+                    except BrokenPipeError:
+                        written = len(stdin_data)
+                    if written >= len(stdin_data):
+                        selector.unregister(proc.stdin)
+                        proc.stdin.close()
+                    continue
+                
+                chunk = os.read(key.fileobj.fileno(), CHUNK_SIZE)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    continue
+                if key.fileobj is proc.stdout:
+                    stdout_size += len(chunk)
+                    if capture_cap is None or len(stdout) < capture_cap:
+                        stdout += chunk if capture_cap is None else chunk[:capture_cap - len(stdout)]
+                    if output_cap is not None and stdout_size > output_cap:
+                        killed_for = VERDICT_OLE
+                        break
+                    if on_stdout is not None and not on_stdout(chunk):
+                        killed_for = VERDICT_WA
+                        break
+                elif len(stderr) < STDERR_LIMIT:
+                    stderr += chunk[:STDERR_LIMIT - len(stderr)]
+            
+            if killed_for:
+                break
+    
+    # Com stdout e stderr fechados o filho pode continuar vivo (dormindo ou
+    # bloqueado, sem gastar CPU): a espera também respeita o prazo
+    while status is None and not killed_for:
+        pid, wait_status, wait_usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            status, usage, exited_at = wait_status, wait_usage, time.perf_counter()
+            break
+        if time.perf_counter() >= deadline:
+            killed_for = VERDICT_TLE
+            break
+        time.sleep(WAIT_INTERVAL)
+    
+    if killed_for:
+        kill_group(proc)
+    
+    # wait4 devolve o uso de recursos deste filho específico
+    if status is None:
+        _, status, usage = os.wait4(proc.pid, 0)
+        exited_at = time.perf_counter()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = exited_at - start
+    for stream in (proc.stdin, proc.stdout, proc.stderr):
+        if stream is not None and not stream.closed:
+            stream.close()
+    # Qualquer processo que tenha sobrado no grupo também é encerrado
+    kill_group(proc)
+    
+    stderr_text = stderr.decode('utf-8', errors='replace')
+    if killed_for:
+        verdict = killed_for
+    elif enforce_limits:
+        verdict = classify_exit(proc.returncode, usage.ru_maxrss, limits, stderr_text)
+    else:
+        verdict = VERDICT_OK
+    
+    return {
+        'verdict': verdict,
+        'stdout': stdout.decode('utf-8', errors='replace'),
+        'stderr': stderr_text,
+        'returncode': proc.returncode,
+        'time': elapsed,
+        'cpu_time': usage.ru_utime + usage.ru_stime,
+        'max_rss_kb': usage.ru_maxrss,
+    }
+
+def classify_exit(returncode: int, max_rss_kb: int, limits: Dict, stderr: str) -> str:
+    """Traduz o término do processo em veredito"""
+    if returncode == 0:
+        return VERDICT_OK
+    
+    sig = -returncode if returncode < 0 else None
+    if sig in (signal.SIGXCPU, signal.SIGKILL):
+        return VERDICT_TLE
+    if sig == signal.SIGXFSZ:
+        return VERDICT_OLE
+    
+    # Com RLIMIT_AS a alocação falha (bad_alloc/abort) antes de o RSS chegar ao limite
+    near_limit = max_rss_kb >= limits['memory_mb'] * 1024 * 0.9
+    if 'bad_alloc' in stderr or near_limit:
+        return VERDICT_MLE
+    
+    return VERDICT_RE
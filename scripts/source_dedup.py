@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Source Dedup - Identifica submissões equivalentes entre repositórios
+
+Normaliza os fontes C++ (sem comentários e sem espaços que não mudam o
+programa, preservando o conteúdo de strings e as quebras de linha das
+diretivas de pré-processador) e calcula um hash do resultado. Fontes com o
+mesmo hash são compilados e testados uma única vez pelo classroom_grader.
+Também agrupa as submissões em clusters e aponta pares muito parecidos.
+"""
+
+import re
+import hashlib
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+SHINGLE_SIZE = 5
+DEFAULT_SIMILARITY = 0.9
+
+# Pares de símbolos que viram um só token se o espaço entre eles sumir
+PUNCTUATOR_PAIRS = {
+    '++', '--', '->', '&&', '||', '<<', '>>', '<=', '>=', '==', '!=', '+=', '-=', '*=', '/=',
+    '%=', '&=', '|=', '^=', '::', '##', '.*', '..', '//', '/*', '<:', ':>', '<%', '%>', '%:',
+}
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z_]\w*|\d[\w.]*|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\S')
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+def normalize_source(source: str) -> str:
+    """Remove comentários e espaços irrelevantes sem tocar em literais"""
+    out = []
+    i = 0
+    n = len(source)
+    pending_space = False
+    directive = False
+    at_line_start = True
+    
+    while i < n:
+        ch = source[i]
+        
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            pending_space = True
+            continue
+        
+        if ch.isspace():
+            if ch == '\n' and directive and not (out and out[-1] == '\\'):
+                # A diretiva termina na quebra de linha: ela precisa continuar lá
+                out.append('\n')
+                directive = False
+                pending_space = False
+            elif out and out[-1] != '\n':
+                pending_space = True
+            if ch == '\n':
+                at_line_start = True
+            i += 1
+            continue
+        
+        if ch == '#' and at_line_start:
+            directive = True
+        at_line_start = False
+        
+        # Espaço só importa entre dois caracteres de identificador/número ou
+        # entre dois símbolos que, juntos, formariam outro token (a - -b)
+        if pending_space and out and (_is_word(out[-1][-1]) and _is_word(ch)
+                                      or out[-1][-1] + ch in PUNCTUATOR_PAIRS):
+            out.append(' ')
+        pending_space = False
+        
+        if ch in '"\'':
+            # Literal copiado inteiro, com escapes
+            j = i + 1
+            while j < n and source[j] != ch and source[j] != '\n':
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+            continue
+        
+        out.append(ch)
+        i += 1
+    
+    return ''.join(out).strip()
+
+def source_fingerprint(source: str) -> str:
+    """Hash do fonte normalizado"""
+    return hashlib.sha256(normalize_source(source).encode('utf-8')).hexdigest()
+
+def file_fingerprint(path: Path) -> Optional[str]:
+    """Hash normalizado de um arquivo, ou None se ele não existir"""
+    try:
+        return source_fingerprint(path.read_text(encoding='utf-8', errors='replace'))
+    except OSError:
+        return None
+
+def shingles(source: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Conjunto de hashes de sequências de tokens (para similaridade aproximada)"""
+    tokens = TOKEN_PATTERN.findall(normalize_source(source))
+    if len(tokens) <= size:
+        return {hash(tuple(tokens))}
+    return {hash(tuple(tokens[k:k + size])) for k in range(len(tokens) - size + 1)}
+
+def similarity(a: Set[int], b: Set[int]) -> float:
+    """Índice de Jaccard entre dois conjuntos de shingles"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def cluster_report(groups: Dict[str, List[str]], sources: Dict[str, str],
+                   template: Optional[str] = None,
+                   threshold: float = DEFAULT_SIMILARITY) -> Dict:
+    """Monta o relatório de um exercício: clusters idênticos e pares parecidos"""
+    clusters = [
+        {
+            'fingerprint': fingerprint,
+            'size': len(repos),
+            'template': fingerprint == template,
+            'repos': sorted(repos),
+        }
+        for fingerprint, repos in groups.items()
+    ]
+    clusters.sort(key=lambda cluster: (-cluster['size'], cluster['fingerprint']))
+    
+    # Só os representativos de cada cluster são comparados entre si
+    signatures = {fingerprint: shingles(source) for fingerprint, source in sources.items()}
+    similar = []
+    for a, b in combinations(sorted(signatures), 2):
+        score = similarity(signatures[a], signatures[b])
+        if score >= threshold:
+            similar.append({
+                'score': round(score, 3),
+                'repos': [sorted(groups[a]), sorted(groups[b])],
+            })
+    similar.sort(key=lambda pair: -pair['score'])
+    
+    return {
+        'submissions': sum(len(repos) for repos in groups.values()),
+        'distinct': len(groups),
+        'clusters': clusters,
+        'similar': similar,
+    }
@@ -6,10 +6,17 @@ Test Generator - Gera casos de teste automaticamente baseado no tipo de problema
 import os
 import json
 import random
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from instrumentation import span, count
+from payloads import externalize, payload_label
+
 TEMP_DIR = Path("temp")
 SRC_DIR = Path("src")
+DEFAULT_TIMEOUT_MS = 1000
+DEFAULT_JOBS = os.cpu_count() or 1
+MAX_TEST_COMMENTS = 10  # Testes gerados pela referência podem ser muitos e longos
 
 def generate_math_tests(problem_types, description):
     """Gera testes para problemas matemáticos"""
@@ -215,8 +222,11 @@ def generate_cpp_code(exercise, tests):
     
     # Gera comentários @test
     test_comments = []
-    for test in tests:
-        test_comments.append(f" * @test name=\"{test['name']}\" input=\"{test['input']}\" expected=\"{test['expected']}\"")
+    for test in tests[:MAX_TEST_COMMENTS]:
+        test_comments.append(f" * @test name=\"{test['name']}\" input=\"{payload_label(test, 'input')}\" "
+                             f"expected=\"{payload_label(test, 'expected')}\"")
+    if len(tests) > MAX_TEST_COMMENTS:
+        test_comments.append(f" * (+{len(tests) - MAX_TEST_COMMENTS} casos em temp/*_with_tests.json)")
     
     test_section = '\n'.join(test_comments)
     
@@ -226,7 +236,7 @@ def generate_cpp_code(exercise, tests):
  * @description {desc_short}
  * @input stdin
  * @output stdout
- * @timeout 1000
+ * @timeout {exercise.get('timeout_ms', DEFAULT_TIMEOUT_MS)}
 {test_section}
  */
 
@@ -250,11 +260,89 @@ int main() {{
     return 0;
 }}
 """
-    
+
     return cpp_template
 
+def write_if_changed(path, content):
+    """Grava o arquivo só se o conteúdo mudou (mtime intacto mantém os caches de compilação)"""
+    path = Path(path)
+    data = content.encode('utf-8')
+    try:
+        if path.read_bytes() == data:
+            count('files_unchanged')
+            return False
+    except OSError:
+        pass
+    path.write_bytes(data)
+    count('files_written')
+    return True
+
+def write_exercise(lista_name, exercise, seed=None, cache=None, output_cache=None):
+    """Gera os testes e o main.cpp de um exercício; retorna o caminho do main.cpp"""
+    ex_num = exercise['number']
+    ex_dir = SRC_DIR / lista_name / f"ex{ex_num:02d}"
+    ex_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Gera testes: com solução de referência, entradas aleatórias e saídas dela
+    with span('generate_tests', exercise=ex_num):
+        tests = None
+        if seed is not None:
+            from reference_tests import has_reference, generate_reference_tests
+            if has_reference(lista_name, ex_num):
+                tests = generate_reference_tests(lista_name, ex_num, seed, cache, output_cache=output_cache)
+        if tests is None:
+            tests = generate_tests_for_exercise(exercise)
+    # Entradas e saídas grandes vão para testdata/ e o JSON guarda só caminho e hash
+    tests = [externalize(test) for test in tests]
+    exercise['tests'] = tests
+    exercise.setdefault('timeout_ms', DEFAULT_TIMEOUT_MS)
+    count('tests', len(tests))
+    
+    # Gera código C++
+    cpp_code = generate_cpp_code(exercise, tests)
+    
+    # Salva main.cpp
+    main_cpp_path = ex_dir / "main.cpp"
+    with span('write_cpp', cat='io', file=str(main_cpp_path)):
+        changed = write_if_changed(main_cpp_path, cpp_code)
+    
+    note = "" if changed else " (inalterado)"
+    print(f"  {lista_name}/ex{ex_num:02d}: {len(tests)} testes gerados -> {main_cpp_path}{note}")
+    return main_cpp_path
+
+def write_exercises(jobs, seed=None, workers=DEFAULT_JOBS, cache=None, output_cache=None):
+    """Gera vários exercícios em paralelo; jobs é uma lista de (lista, exercício)"""
+    if workers <= 1 or len(jobs) <= 1:
+        return [write_exercise(lista_name, exercise, seed, cache, output_cache) for lista_name, exercise in jobs]
+    
+    # O trabalho pesado (compilar e rodar a referência) fica nos subprocessos,
+    # então threads bastam; cada exercício só altera o próprio dicionário
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda job: write_exercise(*job, seed, cache, output_cache), jobs))
+
+def save_lista_tests(lista_data):
+    """Grava o _with_tests.json usado pelo run_tests e pelo autograding_generator"""
+    output_file = TEMP_DIR / f"{lista_data['lista_name']}_with_tests.json"
+    with span('write_json', cat='io', file=str(output_file)):
+        write_if_changed(output_file, json.dumps(lista_data, ensure_ascii=False, indent=2))
+    return output_file
+
 def main():
     """Função principal"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Gera testes e main.cpp a partir dos exercícios parseados')
+    parser.add_argument('--seed', default='0',
+                        help='Semente das entradas geradas pelas soluções de referência (padrão: 0)')
+    parser.add_argument('--no-reference', action='store_true',
+                        help='Ignora referencias/ e usa só as tabelas fixas de testes')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f'Número de exercícios gerados em paralelo (padrão: {DEFAULT_JOBS})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Roda a referência em todas as entradas, sem o cache de saídas nem o de compilação')
+    args = parser.parse_args()
+    seed = None if args.no_reference else args.seed
+    
     # Encontra todos os arquivos parseados
     parsed_files = sorted(TEMP_DIR.glob("*_parsed.json"))
     
@@ -265,49 +353,34 @@ def main():
     
     print(f"Encontrados {len(parsed_files)} arquivo(s) para gerar testes")
     
-    total_exercises = 0
-    
+    listas = []
     for parsed_file in parsed_files:
-        lista_name = parsed_file.stem.replace('_parsed', '')
-        
-        with open(parsed_file, 'r', encoding='utf-8') as f:
-            lista_data = json.load(f)
-        
-        print(f"\nProcessando {lista_name}:")
-        
-        # Cria diretório da lista
-        lista_dir = SRC_DIR / lista_name
-        lista_dir.mkdir(parents=True, exist_ok=True)
-        
-        for exercise in lista_data['exercises']:
-            ex_num = exercise['number']
-            ex_dir = lista_dir / f"ex{ex_num:02d}"
-            ex_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Gera testes
-            tests = generate_tests_for_exercise(exercise)
-            exercise['tests'] = tests
-            
-            # Gera código C++
-            cpp_code = generate_cpp_code(exercise, tests)
-            
-            # Salva main.cpp
-            main_cpp_path = ex_dir / "main.cpp"
-            with open(main_cpp_path, 'w', encoding='utf-8') as f:
-                f.write(cpp_code)
-            
-            print(f"  Ex{ex_num:02d}: {len(tests)} testes gerados -> {main_cpp_path}")
-            total_exercises += 1
-        
-        # Atualiza arquivo JSON com testes
-        lista_data['exercises'] = [ex for ex in lista_data['exercises']]
-        output_file = TEMP_DIR / f"{lista_name}_with_tests.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(lista_data, f, ensure_ascii=False, indent=2)
+        with span('load_json', cat='io', file=str(parsed_file)):
+            with open(parsed_file, 'r', encoding='utf-8') as f:
+                listas.append(json.load(f))
+    
+    cache = output_cache = None
+    if seed is not None and not args.no_cache:
+        from compile_cache import CompileCache
+        from reference_tests import OutputCache
+        cache = CompileCache()
+        output_cache = OutputCache()
+    
+    # Todos os exercícios de todas as listas entram no mesmo pool
+    jobs = [(parsed_file.stem.replace('_parsed', ''), exercise)
+            for parsed_file, lista_data in zip(parsed_files, listas)
+            for exercise in lista_data['exercises']]
+    write_exercises(jobs, seed, max(1, args.jobs), cache, output_cache)
+    
+    # Atualiza arquivos JSON com testes
+    for lista_data in listas:
+        save_lista_tests(lista_data)
     
     print(f"\n{'='*50}")
-    print(f"Geração concluída: {total_exercises} exercício(s) criados")
+    print(f"Geração concluída: {len(jobs)} exercício(s) criados")
     print(f"Código fonte salvo em: {SRC_DIR}/")
+    if output_cache is not None and (output_cache.hits or output_cache.misses):
+        print(f"Saídas da referência: {output_cache.hits} reaproveitada(s), {output_cache.misses} calculada(s)")
     print(f"Próximo passo: execute 'python3 scripts/autograding_generator.py'")
 
 if __name__ == "__main__":